@@ -183,15 +183,19 @@ class NaijaPhone:
     def buy_airtime(self, amount):
         self.airtime_balance += amount
         return f"\u20A6{amount} airtime purchased. Balance: \u20A6{self.airtime_balance}"
+    def _consume(self, cost):
+        # Deducts the cost only when the phone is on and can afford it
+        ok = self.is_on & (self.airtime_balance >= cost)
+        self.airtime_balance -= cost * ok
+        return ok
+
     def make_call(self, number):
-        if self.is_on and self.airtime_balance > 0:
-            self.airtime_balance -= 10
+        if self._consume(10):
             return f"Calling {number}... Remaining airtime: \u20A6{self.airtime_balance}" 
         return "Cannot make call. check phone power or airtime"
  
     def send_sms(self, message, number):
-        if self.is_on and self.airtime_balance > 0:
-            self.airtime_balance -= 5
+        if self._consume(5):
             return f"SMS sent to {number}: '{message}. remaining airtime: \u20A6{self.airtime_balance}"
         return "Insufficient airtime to send SMS"
     
@@ -229,16 +233,18 @@ class NigerianBankAccount:
     def deposit(self, amount):
         if amount > 0:
             self._balance += amount
-            self._transaction_history.append(f"Deposited ₦{amount:,}")
-            return f"₦{amount:,} deposited successfully"
+            amount_text = f"{amount:,}"
+            self._transaction_history.append(f"Deposited ₦{amount_text}")
+            return f"₦{amount_text} deposited successfully"
         return "Invalid deposit amount"
     
     def withdraw(self, amount, pin):
         if self.__verify_pin(pin):  # Uses private method
             if amount <= self._balance:
                 self._balance -= amount
-                self._transaction_history.append(f"Withdrew ₦{amount:,}")
-                return f"₦{amount:,} withdrawn successfully"
+                amount_text = f"{amount:,}"
+                self._transaction_history.append(f"Withdrew ₦{amount_text}")
+                return f"₦{amount_text} withdrawn successfully"
             return "Insufficient funds"
         return "Invalid PIN"
     
@@ -253,6 +259,7 @@ class NigerianBankAccount:
     
            # Protected method - subclasses can use this
     def _get_transaction_history(self):
+        return self._transaction_history
 
 ibrahim_account = NigerianBankAccount("Ibrahim Orekunrin", 50000)
 
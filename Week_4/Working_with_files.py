@@ -41,10 +41,10 @@ full_path = folder / "myfile.txt"
 print("Full path:", full_path)
 
 from pathlib import Path
+import sys
 
 #  Get parent folder of current file
 print("Parent folder:", Path.cwd().parent)
 
-# List all files in a directory
-for file in Path.cwd().iterdir():
-    print(file)
\ No newline at end of file
+# List all files in a directory (one write instead of a print per file)
+sys.stdout.write("".join(f"{file}\n" for file in Path.cwd().iterdir()))
\ No newline at end of file
@@ -48,8 +48,23 @@
 #         return "Cannot divide by zero"
     
     
+import importlib.util
+import sys
+
+
+def lazy(name):
+    # load a module only when one of its attributes is first used
+    spec = importlib.util.find_spec(name)
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+    return module
+
+
 import first
-import second
+second = lazy("second")
 
 # lets use the functions in the first.py file
 print("=== Math Functions ===")
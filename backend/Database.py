@@ -42,33 +42,56 @@
 
 
 from sqlalchemy import create_engine, text
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
-from dotenv import load_dotenv
 from pymysql.constants import CLIENT
-import os
+from config import CFG
 
-load_dotenv()
+db_url = CFG.db_url
 
-db_url = (
-    f"mysql+pymysql://{os.getenv('dbuser')}:{os.getenv('dbpassword')}"
-    f"@{os.getenv('dbhost')}:{os.getenv('dbport')}/{os.getenv('dbname')}"
-)
+# Size of the connection pool, opened eagerly at app startup. Behind a
+# pooler the app only needs a couple of connections; the pooler
+# multiplexes them onto server connections.
+pool_size = 2 if CFG.db_pooler else 20
 
 # Create engine with support for multiple statements
-engine = create_engine(db_url, connect_args={"client_flag": CLIENT.MULTI_STATEMENTS})
+engine = create_engine(
+    db_url,
+    pool_size=pool_size,
+    max_overflow=0,
+    pool_recycle=3600,
+    pool_pre_ping=False,
+    pool_use_lifo=True,
+    query_cache_size=1200,
+    connect_args={"client_flag": CLIENT.MULTI_STATEMENTS},
+)
 
 # Create session
 Session = sessionmaker(bind=engine)
 db = Session()
 
+# Async engine for endpoints that await their queries
+async_engine = create_async_engine(
+    CFG.async_db_url,
+    pool_size=pool_size,
+    max_overflow=0,
+    pool_recycle=3600,
+    pool_pre_ping=False,
+    pool_use_lifo=True,
+    query_cache_size=1200,
+)
+AsyncSession = async_sessionmaker(async_engine, expire_on_commit=False)
+
 try:
-    # Create user table
+    # Create users table, with the columns user.py reads and writes
     db.execute(text("""
-        CREATE TABLE IF NOT EXISTS user (
-            userid INT AUTO_INCREMENT PRIMARY KEY,
+        CREATE TABLE IF NOT EXISTS users (
+            id INT AUTO_INCREMENT PRIMARY KEY,
             name VARCHAR(255) NOT NULL,
             email VARCHAR(255) NOT NULL,
-            password VARCHAR(255) NOT NULL
+            password VARBINARY(255) NOT NULL,
+            userType VARCHAR(50) NOT NULL DEFAULT 'student',
+            UNIQUE INDEX ix_users_email (email)
         );
     """))
 
@@ -81,13 +104,13 @@ try:
         );
     """))
 
-    # Create enrollments table (after user & courses exist)
+    # Create enrollments table (after users & courses exist)
     db.execute(text("""
         CREATE TABLE IF NOT EXISTS enrollments (
             id INT AUTO_INCREMENT PRIMARY KEY,
             userid INT,
             courseid INT,
-            FOREIGN KEY (userid) REFERENCES user(userid),
+            FOREIGN KEY (userid) REFERENCES users(id),
             FOREIGN KEY (courseid) REFERENCES courses(courseid)
         );
     """))
@@ -0,0 +1,25 @@
+"""store password hash as bytes
+
+Revision ID: 5d3c9a7e1b24
+Revises: 82072b989f4f
+Create Date: 2026-10-15 10:02:41.518230
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5d3c9a7e1b24'
+down_revision: Union[str, Sequence[str], None] = '82072b989f4f'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.alter_column("users", "password", type_=sa.VARBINARY(255), existing_type=sa.String(255), existing_nullable=False)
+
+def downgrade() -> None:
+    op.alter_column("users", "password", type_=sa.String(255), existing_type=sa.VARBINARY(255), existing_nullable=False)
@@ -19,7 +19,7 @@ depends_on: Union[str, Sequence[str], None] = None
 
 
 def upgrade() -> None:
-    op.add_column("user", sa.Column("gender", sa.String(20), nullable=True))
+    op.add_column("users", sa.Column("gender", sa.String(20), nullable=True))
 
 def downgrade() -> None:
-    op.drop_column("user", "gender")
+    op.drop_column("users", "gender")
@@ -0,0 +1,25 @@
+"""add unique user email
+
+Revision ID: a41f6e08c7d3
+Revises: 5d3c9a7e1b24
+Create Date: 2026-10-15 10:48:07.204519
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a41f6e08c7d3'
+down_revision: Union[str, Sequence[str], None] = '5d3c9a7e1b24'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index("ix_users_email", "users", ["email"], unique=True)
+
+def downgrade() -> None:
+    op.drop_index("ix_users_email", table_name="users")
@@ -1,16 +1,23 @@
 from fastapi import FastAPI
+from fastapi.responses import ORJSONResponse
 from pydantic import BaseModel,Field  
 from dotenv import load_dotenv
 import uvicorn
+import array
 import os
+import sys
 
 
 load_dotenv()
 
-app= FastAPI(title="Simple FastAPI App ", version="1.0.0")
-data = [{"Name": "Sam Larry", "age": 20, "track": "AI Developer"},
-        {"Name": "bahubili", "age": 21, "track": "Backend Developer"},
-        {"Name": "John Doe", "age": 22, "track": "Frontend Developer"}]
+app= FastAPI(title="Simple FastAPI App ", version="1.0.0", default_response_class=ORJSONResponse)
+# Records are stored column-wise; dicts are only built when serializing
+names: list[str] = ["Sam Larry", "bahubili", "John Doe"]
+ages: array.array = array.array("i", [20, 21, 22])
+tracks: list[str] = ["AI Developer", "Backend Developer", "Frontend Developer"]
+
+def rows():
+    return [{"Name": n, "age": a, "track": t} for n, a, t in zip(names, ages, tracks)]
 
 class Item(BaseModel):
     name: str = Field(..., example="perpetual")
@@ -21,18 +28,22 @@ class Item(BaseModel):
 def root():
     return {"Message": "Welcome to my fastAPI application"}
 
-app.get("/get-data")
+@app.get("/get-data")
 def get_data():
-    return data
+    return rows()
 
 @app.post("/create-data")
 def create_data(req: Item):
+    data = rows()
     print(data)
     return {"Message": "Data Recieved", "Data": data}
 
 @app.put("/update-data/{id}")
 def update_data(id: int, req: Item):
-    data[id] = req.dict()
+    names[id] = req.name
+    ages[id] = req.age
+    tracks[id] = req.track
+    data = rows()
     print (data)
     return {"Message": "Data Updated", "Data": data}
 
@@ -40,4 +51,10 @@ def update_data(id: int, req: Item):
 if __name__ == "__main__":
     print(os.getenv("host"))
     print(os.getenv("port"))
-    uvicorn.run(app, host=os.getenv("host"), port=int(os.getenv("port")))
\ No newline at end of file
+    uvicorn.run(
+        app,
+        host=os.getenv("host"),
+        port=int(os.getenv("port")),
+        loop="asyncio" if sys.platform == "win32" else "uvloop",
+        http="httptools",
+    )
\ No newline at end of file
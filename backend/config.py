@@ -0,0 +1,59 @@
+from dataclasses import dataclass
+from dotenv import load_dotenv
+import os
+
+load_dotenv()
+
+
+# Environment settings, read once at import and shared by every module
+@dataclass(frozen=True, slots=True)
+class Config:
+    secret_key: str
+    algorithm: str
+    db_user: str
+    db_password: str
+    db_host: str
+    db_port: str
+    db_name: str
+    # True when dbhost/dbport point at a connection pooler (e.g. ProxySQL)
+    db_pooler: bool
+    bcrypt_cost: int
+    # "bcrypt" or "argon2" (Argon2id) for newly stored password hashes
+    password_hasher: str
+    token_time: int
+    host: str
+    port: int
+    # Each worker opens its own pool of Database.pool_size connections
+    workers: int
+
+    @property
+    def db_url(self) -> str:
+        return (
+            f"mysql+pymysql://{self.db_user}:{self.db_password}"
+            f"@{self.db_host}:{self.db_port}/{self.db_name}"
+        )
+
+    @property
+    def async_db_url(self) -> str:
+        return (
+            f"mysql+aiomysql://{self.db_user}:{self.db_password}"
+            f"@{self.db_host}:{self.db_port}/{self.db_name}"
+        )
+
+
+CFG = Config(
+    secret_key=os.environ["secret_key"],
+    algorithm="HS256",
+    db_user=os.getenv("dbuser"),
+    db_password=os.getenv("dbpassword"),
+    db_host=os.getenv("dbhost"),
+    db_port=os.getenv("dbport"),
+    db_name=os.getenv("dbname"),
+    db_pooler=os.getenv("dbpooler", "0") == "1",
+    bcrypt_cost=int(os.getenv("bcrypt_cost", "12")),
+    password_hasher=os.getenv("password_hasher", "bcrypt"),
+    token_time=int(os.environ["token_time"]),
+    host=os.getenv("host", "127.0.0.1"),
+    port=int(os.getenv("port", "8000")),
+    workers=int(os.getenv("workers", "1")),
+)
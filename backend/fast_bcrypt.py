@@ -0,0 +1,101 @@
+import asyncio
+import base64
+import logging
+import os
+import secrets
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from config import CFG
+
+# pyca bcrypt (Rust core) releases the GIL while hashing
+import bcrypt as _backend
+logging.getLogger(__name__).info(
+    "Password hashing uses %s %s", _backend.__name__, getattr(_backend, "__version__", "")
+)
+
+# Argon2id is optional: new hashes use it when password_hasher=argon2, and
+# existing $argon2id$ hashes verify whenever argon2-cffi is installed.
+try:
+    from argon2 import PasswordHasher
+    from argon2.exceptions import VerificationError
+    _argon2 = PasswordHasher(time_cost=3, memory_cost=64 * 1024, parallelism=2)
+except ImportError:
+    _argon2 = None
+if CFG.password_hasher == "argon2" and _argon2 is None:
+    raise ImportError("password_hasher=argon2 requires the argon2-cffi package")
+
+# bcrypt salts are 16 random bytes in bcrypt's own base64 alphabet
+salt_prefix = b"$2b$%02d$" % CFG.bcrypt_cost
+salt_alphabet = bytes.maketrans(
+    b"ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789+/",
+    b"./ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789",
+)
+
+# Salts are generated in batches from a single read of the system RNG
+salt_pool_size = 256
+_salt_pool = deque()
+
+
+def _refill_salts():
+    raw = secrets.token_bytes(16 * salt_pool_size)
+    _salt_pool.extend(
+        salt_prefix + base64.b64encode(raw[i:i + 16]).translate(salt_alphabet)[:22]
+        for i in range(0, len(raw), 16)
+    )
+
+
+def gensalt() -> bytes:
+    while True:
+        try:
+            return _salt_pool.popleft()
+        except IndexError:
+            _refill_salts()
+
+
+def hashpw(password: bytes, salt: bytes) -> bytes:
+    return _backend.hashpw(password, salt)
+
+
+def checkpw(password: bytes, hashed_password: bytes) -> bool:
+    return _backend.checkpw(password, hashed_password)
+
+
+def hash_password(password: bytes) -> bytes:
+    if CFG.password_hasher == "argon2":
+        return _argon2.hash(password).encode()
+    return hashpw(password, gensalt())
+
+
+def needs_rehash(hashed_password: bytes) -> bool:
+    # True when a stored hash predates the configured hasher or its settings
+    if CFG.password_hasher != "argon2":
+        return False
+    if not hashed_password.startswith(b"$argon2"):
+        return True
+    return _argon2.check_needs_rehash(hashed_password.decode())
+
+
+def verify_password(password: bytes, hashed_password: bytes) -> bool:
+    # The stored prefix picks the verifier, so both kinds can coexist
+    if hashed_password.startswith(b"$argon2"):
+        try:
+            return _argon2.verify(hashed_password, password)
+        except VerificationError:
+            return False
+    return checkpw(password, hashed_password)
+
+
+# Hashing threads, one per core. bcrypt and argon2-cffi release the GIL
+# while hashing, so threads run in parallel without process start-up or
+# pickling costs.
+pool = ThreadPoolExecutor(max_workers=os.cpu_count())
+
+
+async def hash_password_async(password: bytes) -> bytes:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(pool, hash_password, password)
+
+
+async def verify_password_async(password: bytes, hashed_password: bytes) -> bool:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(pool, verify_password, password, hashed_password)
@@ -1,32 +1,110 @@
-import jwt
-from dotenv import load_dotenv
-import os
+import base64
+import binascii
+import hashlib
+import hmac
+import json
+import logging
+import ssl
+import threading
+import time
+from cachetools import TLRUCache
 from datetime import datetime, timedelta
-from fastapi import Security
+from fastapi import HTTPException, Security
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from fastapi import Request
+from config import CFG
 
-load_dotenv()
-
-secret_key = os.getenv("secret_key")
-algorithm = "Hs256"
+secret_key = CFG.secret_key
+algorithm = CFG.algorithm
 security = HTTPBearer()
 
+# HS256 tokens are signed with HMAC-SHA256 (OpenSSL-backed). The keyed
+# context is built once and copied per token, so the key pads are not
+# recomputed on every call.
+_header = base64.urlsafe_b64encode(
+    json.dumps({"alg": algorithm, "typ": "JWT"}, separators=(",", ":")).encode()
+).rstrip(b"=")
+_hmac_ctx = hmac.new(secret_key.encode(), None, hashlib.sha256)
+
+# OpenSSL dispatches SHA-256 to the SHA-NI instructions when the CPU has
+# them; the builtin fallback hashlib does not.
+logger = logging.getLogger(__name__)
+if type(hashlib.sha256()).__module__ == "_hashlib":
+    logger.info("Token signing uses %s SHA-256", ssl.OPENSSL_VERSION)
+else:
+    logger.info("Token signing uses Python's builtin SHA-256 (no OpenSSL acceleration)")
+
+
+_urlsafe = bytes.maketrans(b"+/", b"-_")
+
+
+def _b64encode(data: bytes) -> bytes:
+    # binascii is the C encoder behind base64; calling it directly skips
+    # urlsafe_b64encode's Python-level wrappers
+    return binascii.b2a_base64(data, newline=False).translate(_urlsafe).rstrip(b"=")
+
+
+def _b64decode(data: bytes) -> bytes:
+    return base64.urlsafe_b64decode(data + b"=" * (-len(data) % 4))
+
+
+def _sign(signing_input: bytes) -> bytes:
+    ctx = _hmac_ctx.copy()
+    ctx.update(signing_input)
+    return ctx.digest()
+
+
 def create_token(details: dict, expiry: int):
     expire = datetime.now() + timedelta(minutes=expiry)
-    details.update({"exp": expire})
-    encoded_jwt = jwt.encode(details, secret_key, algorithm = algorithm)
-     
-    return encoded_jwt
+    details.update({"exp": int(expire.timestamp())})
+    payload = _b64encode(json.dumps(details, separators=(",", ":")).encode())
+    signing_input = _header + b"." + payload
+    encoded_jwt = signing_input + b"." + _b64encode(_sign(signing_input))
+
+    return encoded_jwt.decode()
+
+
+def decode_token(token: str) -> dict:
+    try:
+        signing_input, signature = token.encode().rsplit(b".", 1)
+        header, payload = signing_input.split(b".")
+        valid = hmac.compare_digest(_b64decode(signature), _sign(signing_input))
+        if not valid or json.loads(_b64decode(header)).get("alg") != algorithm:
+            raise ValueError("Invalid signature")
+        claims = json.loads(_b64decode(payload))
+    except ValueError:
+        raise HTTPException(status_code=401, detail="Invalid token")
+    if claims.get("exp", 0) < datetime.now().timestamp():
+        raise HTTPException(status_code=401, detail="Token has expired")
+    return claims
+
+
+# Verified tokens, kept for 15s or until the token expires, whichever is
+# sooner. Entries are shared between requests and must not be mutated.
+_verified_cache = TLRUCache(
+    maxsize=8192,
+    ttu=lambda token, user, now: min(now + 15, user["exp"]),
+    timer=time.time,
+)
+_verified_lock = threading.Lock()
+
 
 bearer = HTTPBearer()
 def verify_token(request: HTTPAuthorizationCredentials = Security(bearer)):
-    
+
     token = request.credentials
-    verified_token = jwt.decode(token, secret_key, algorithms=["HS256"])
+    with _verified_lock:
+        user = _verified_cache.get(token)
+    if user is not None:
+        return user
+    verified_token = decode_token(token)
     expiry_time = verified_token.get("exp")
 
-    return {
-        "email": verified_token.get["email"],
-        "usertype": verified_token.get["usertype"]
-   }
\ No newline at end of file
+    user = {
+        "email": verified_token.get("email"),
+        "usertype": verified_token.get("usertype"),
+        "exp": expiry_time
+    }
+    with _verified_lock:
+        _verified_cache[token] = user
+    return user
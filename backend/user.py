@@ -121,102 +121,223 @@
 
 
 
-from fastapi import FastAPI, HTTPException
-from pydantic import BaseModel, Field
-from sqlalchemy import text
-from Database import db
-import os
-from dotenv import load_dotenv
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import JSONResponse, ORJSONResponse
+from pydantic import BaseModel, EmailStr, Field, conlist, field_validator
+from sqlalchemy import bindparam, text
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession as AsyncSessionType
+from Database import async_engine, pool_size, AsyncSession
+import asyncio
+import sys
 import uvicorn
-import bcrypt
-import jwt
+import fast_bcrypt as bcrypt
+import threading
+import logging
+from collections import namedtuple
+from cachetools import TTLCache
 from middleware import create_token, verify_token
+from config import CFG
 from fastapi import Depends
-#  Load environment variables
-load_dotenv()
-app = FastAPI(title="Simple App", version="1.0.0")
-token_time = int(os.getenv("token_time"))
+app = FastAPI(title="Simple App", version="1.0.0", default_response_class=ORJSONResponse)
+app.add_middleware(GZipMiddleware, minimum_size=512)
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+token_time = CFG.token_time
+# SQL statements, built once and reused by every request
+# A duplicate email hits the unique index ix_users_email (migration
+# a41f6e08c7d3) and raises IntegrityError
+insert_user_query = text("""
+    INSERT INTO users (name, email, password)
+    VALUES (:name, :email, :password)
+""")
+existing_emails_query = text("""
+    SELECT email FROM users WHERE email IN :emails
+""").bindparams(bindparam("emails", expanding=True))
+login_query = text("""
+    SELECT id, email, password, userType FROM users WHERE email = :email LIMIT 1
+""")
+update_password_query = text("""
+    UPDATE users SET password = :password WHERE id = :id
+""")
+insert_course_query = text("""
+    INSERT INTO courses (title, level)
+    VALUES (:title, :level)
+""")
+# The login columns, copied out of the SQLAlchemy Row once
+UserAuth = namedtuple("UserAuth", "id email password userType")
+# Recently looked-up users, keyed by email
+user_cache = TTLCache(maxsize=10_000, ttl=30)
+# Verified against when the email has no account, so unknown and known
+# emails cost the same hashing work and take the same time
+dummy_hash = bcrypt.hash_password(b"dummy-password")
+user_cache_lock = threading.Lock()
+# MySQL error code for a unique-key violation
+ER_DUP_ENTRY = 1062
+def is_duplicate_entry(exc: IntegrityError) -> bool:
+    return bool(exc.orig.args) and exc.orig.args[0] == ER_DUP_ENTRY
+async def get_user_by_email(session: AsyncSessionType, email: str) -> UserAuth | None:
+    with user_cache_lock:
+        user = user_cache.get(email)
+    if user is not None:
+        return user
+    row = (await session.execute(login_query, {"email": email})).fetchone()
+    if row is None:
+        return None
+    password = row[2]
+    # Columns not yet migrated to VARBINARY return the hash as str
+    if isinstance(password, str):
+        password = password.encode('utf-8')
+    user = UserAuth(row[0], row[1], password, row[3])
+    with user_cache_lock:
+        user_cache[email] = user
+    return user
 #  Pydantic model
 class Simple(BaseModel):
     name: str = Field(..., example="Ola James")
-    email: str = Field(..., example="olajames@email.com")
+    email: EmailStr = Field(..., example="olajames@email.com")
     password: str = Field(..., example="james123")
+    # Stored and looked up lowercased so every query hits the email index
+    @field_validator("email")
+    @classmethod
+    def lowercase_email(cls, value: str) -> str:
+        return value.strip().lower()
+@app.on_event("startup")
+async def warm_pool() -> None:
+    # Open every pooled connection up front so early requests skip the handshake
+    connections = await asyncio.gather(*(async_engine.connect() for _ in range(pool_size)))
+    for connection in connections:
+        await connection.close()
+@app.exception_handler(SQLAlchemyError)
+async def database_error(request: Request, exc: SQLAlchemyError) -> JSONResponse:
+    logger.error("Database error: %s", exc)
+    return JSONResponse(status_code=500, content={"detail": "Database error"})
 @app.get("/")
-def read_root():
+def read_root() -> dict:
     return {"message": "Welcome to the User Management API"}
 # Signup endpoint
 @app.post("/signup")
-def signUp(input: Simple):
-    try:
-        # Check if email exists
-        duplicate_query = text("SELECT * FROM users WHERE email = :email")
-        existing = db.execute(duplicate_query, {"email": input.email}).fetchone()
-        if existing:
-            print("Email already exists")
+async def signUp(input: Simple) -> dict:
+    # Hash password off the event loop
+    hashed_password = await bcrypt.hash_password_async(input.password.encode('utf-8'))
+    async with AsyncSession() as session:
+        # Insert new user in one round-trip; the unique index catches duplicates
+        try:
+            await session.execute(insert_user_query, {"name": input.name, "email": input.email, "password": hashed_password})
+            await session.commit()
+        except IntegrityError as exc:
+            if not is_duplicate_entry(exc):
+                raise
             raise HTTPException(status_code=400, detail="Email already exists")
-        # Hash password
-        salt = bcrypt.gensalt()
-        hashed_password = bcrypt.hashpw(input.password.encode('utf-8'), salt)
-        # Insert new user
-        query = text("""
-            INSERT INTO users (name, email, password)
-            VALUES (:name, :email, :password)
-        """)
-        db.execute(query, {"name": input.name, "email": input.email, "password": hashed_password})
-        db.commit()
-        return {
-            "message": "User created successfully",
-            "data": {"name": input.name, "email": input.email}
-        }
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    with user_cache_lock:
+        user_cache.pop(input.email, None)
+    return {
+        "message": "User created successfully",
+        "data": {"name": input.name, "email": input.email}
+    }
+# Bulk signup: one multi-row INSERT and a single commit for the batch.
+# Admin only, and capped, since every user in the batch costs a hash
+max_bulk_signup = 100
+@app.post("/signup/bulk")
+async def signUpBulk(
+    inputs: conlist(Simple, min_length=1, max_length=max_bulk_signup),
+    user_data: dict = Depends(verify_token),
+) -> dict:
+    if user_data["usertype"] != "admin":
+        raise HTTPException(status_code=401, detail="You are not authorized to add users in bulk")
+    # Skip emails that already have an account, or repeat within the batch
+    async with AsyncSession() as session:
+        result = await session.execute(existing_emails_query, {"emails": [item.email for item in inputs]})
+        seen = {row[0] for row in result}
+    new_users = []
+    for item in inputs:
+        if item.email not in seen:
+            seen.add(item.email)
+            new_users.append(item)
+    # Hash with no connection checked out
+    hashed_passwords = await asyncio.gather(
+        *(bcrypt.hash_password_async(item.password.encode('utf-8')) for item in new_users)
+    )
+    rows = [
+        {"name": item.name, "email": item.email, "password": hashed_password}
+        for item, hashed_password in zip(new_users, hashed_passwords)
+    ]
+    if rows:
+        async with AsyncSession() as session:
+            try:
+                await session.execute(insert_user_query, rows)
+                await session.commit()
+            except IntegrityError as exc:
+                if not is_duplicate_entry(exc):
+                    raise
+                raise HTTPException(status_code=409, detail="An email in the batch was registered concurrently; retry")
+    with user_cache_lock:
+        for item in inputs:
+            user_cache.pop(item.email, None)
+    return {
+        "message": "Users created successfully",
+        "created": len(rows),
+        "skipped": len(inputs) - len(rows)
+    }
 class LoginRequest(BaseModel):
-    email: str = Field(..., example="olajames@email.com")
+    email: EmailStr = Field(..., example="olajames@email.com")
     password: str = Field(..., example="james123")
+    @field_validator("email")
+    @classmethod
+    def lowercase_email(cls, value: str) -> str:
+        return value.strip().lower()
 @app.post("/login")
-def login(input: LoginRequest):
-    try:
-        query = text("""
-        SELECT * FROM users WHERE email = :email
-""")
-        result = db.execute(query, {"email": input.email}).fetchone()
-        if not result:
-            raise HTTPException(status_code=404, detail="Invalid email or password")
-        verified_password = bcrypt.checkpw(input.password.encode('utf-8'), result.password.encode('utf-8'))
-        if not verified_password:
-            raise HTTPException(status_code=404, detail="Invalid email or password")
-        encoded_token = create_token(details={
-            "email": result.email,
-            "userType": result.userType,
-            "userid": result.id
-        }, expiry=token_time)
-        return {
-            "message": "Login successful",
-            "token": encoded_token
-        }
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+async def login(input: LoginRequest) -> dict:
+    async with AsyncSession() as session:
+        result = await get_user_by_email(session, input.email)
+    stored_hash = result.password if result else dummy_hash
+    verified_password = await bcrypt.verify_password_async(input.password.encode('utf-8'), stored_hash)
+    if not result or not verified_password:
+        raise HTTPException(status_code=404, detail="Invalid email or password")
+    # Upgrade older hashes (e.g. bcrypt to Argon2id) now that the password is known
+    if bcrypt.needs_rehash(result.password):
+        new_hash = await bcrypt.hash_password_async(input.password.encode('utf-8'))
+        async with AsyncSession() as session:
+            await session.execute(update_password_query, {"password": new_hash, "id": result.id})
+            await session.commit()
+        with user_cache_lock:
+            user_cache.pop(input.email, None)
+    encoded_token = create_token(details={
+        "email": result.email,
+        "usertype": result.userType,
+        "userid": result.id
+    }, expiry=token_time)
+    return {
+        "message": "Login successful",
+        "access_token": encoded_token,
+        "token_type": "bearer"
+    }
 class courseRequest(BaseModel):
     title: str = Field(..., example="backend engineering")
     level: str = Field(..., example="Beginner")
 @app.post("/courses")
-def addcourses(input: courseRequest, user_data = Depends(verify_token)):
-    try:
-        print(user_data)
-        if user_data.userTyper != "admin":
-            raise HTTPException(status_code=401, detail="You are not authorized to add a course")
-        query = text("""
-            INSERT INTO courses (title, level)
-            VALUES (:title, :level)
-        """)
-        db.execute(query, {"title": input.title, "level": input.level})
-        db.commit()
-        return {
-            "message": "Course added successfully",
-            "data": {"title": input.title, "level": input.level}
-        }
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+async def addcourses(input: courseRequest, user_data: dict = Depends(verify_token)) -> dict:
+    logger.debug("user_data=%s", user_data)
+    if user_data["usertype"] != "admin":
+        raise HTTPException(status_code=401, detail="You are not authorized to add a course")
+    async with AsyncSession() as session:
+        await session.execute(insert_course_query, {"title": input.title, "level": input.level})
+        await session.commit()
+    return {
+        "message": "Course added successfully",
+        "data": {"title": input.title, "level": input.level}
+    }
 #  Run app
 if __name__ == "__main__":
-    uvicorn.run(app, host=os.getenv("host"), port=int(os.getenv("port")))
+    uvicorn.run(
+        "user:app",
+        host=CFG.host,
+        port=CFG.port,
+        workers=CFG.workers,
+        loop="asyncio" if sys.platform == "win32" else "uvloop",
+        http="httptools",
+        access_log=False,
+        proxy_headers=False,
+        timeout_keep_alive=30,
+    )
@@ -4,12 +4,20 @@ Use your fine-tuned model with optional document retrieval
 """
 
 import torch
-from transformers import AutoModelForCausalLM, AutoTokenizer
+from concurrent.futures import ThreadPoolExecutor
+from transformers import AutoModelForCausalLM, AutoTokenizer, TextIteratorStreamer
 from sentence_transformers import SentenceTransformer
-import chromadb
+import numpy as np
 from pathlib import Path
+import json
 import logging
 
+# Arrow-key history for input(); readline is not available on Windows
+try:
+    import readline  # noqa: F401
+except ImportError:
+    pass
+
 logging.basicConfig(level=logging.INFO, format='%(message)s')
 logger = logging.getLogger(__name__)
 # CONFIGURATION - EDIT THESE
@@ -22,6 +30,9 @@ DOCUMENTS_FOLDER = None  # Set to your docs folder path, e.g., "my_documents"
 
 # Vector database path
 VECTOR_DB_PATH = "vector_db"
+
+# Words that end the interactive session
+EXIT_COMMANDS = frozenset({"quit", "exit", "q"})
 # SIMPLE RAG SYSTEM
 
 class SimpleRAG:
@@ -30,8 +41,9 @@ class SimpleRAG:
     def __init__(self, docs_folder=None):
         self.docs_folder = docs_folder
         self.embeddings = SentenceTransformer('all-MiniLM-L6-v2')
-        self.client = chromadb.PersistentClient(path=VECTOR_DB_PATH)
-        self.collection = None
+        # Chunk texts and their unit-length embeddings, one row per chunk
+        self.docs = []
+        self.doc_vecs = None
         
         if docs_folder and Path(docs_folder).exists():
             self.setup_documents()
@@ -40,42 +52,52 @@ class SimpleRAG:
         """Load documents into vector database"""
         logger.info(f" Loading documents from {self.docs_folder}")
         
-        # Create collection
-        try:
-            self.collection = self.client.get_collection("documents")
+        db_path = Path(VECTOR_DB_PATH)
+        vectors_file = db_path / "vectors.npy"
+        docs_file = db_path / "documents.json"
+        if vectors_file.exists() and docs_file.exists():
+            self.doc_vecs = np.load(vectors_file)
+            self.docs = json.loads(docs_file.read_text(encoding="utf-8"))
             logger.info("✓ Using existing collection")
-        except:
-            self.collection = self.client.create_collection("documents")
-            
-            # Read all text files
-            docs = []
-            ids = []
-            doc_path = Path(self.docs_folder)
-            
-            for i, file_path in enumerate(doc_path.glob("**/*.txt")):
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    text = f.read()
-                    # Split into chunks
-                    chunks = [text[i:i+500] for i in range(0, len(text), 500)]
-                    for j, chunk in enumerate(chunks):
-                        docs.append(chunk)
-                        ids.append(f"doc_{i}_{j}")
+            return
+        
+        # Read all text files
+        docs = []
+        doc_path = Path(self.docs_folder)
+        
+        for file_path in doc_path.glob("**/*.txt"):
+            with open(file_path, 'r', encoding='utf-8') as f:
+                text = f.read()
+                # Split into chunks
+                docs.extend(text[i:i+500] for i in range(0, len(text), 500))
+        
+        if docs:
+            # Normalize once here so search is a single matrix-vector product
+            vecs = self.embeddings.encode(docs, batch_size=64, convert_to_numpy=True)
+            vecs = vecs.astype(np.float32)
+            vecs /= np.linalg.norm(vecs, axis=1, keepdims=True)
+            self.docs = docs
+            self.doc_vecs = vecs
             
-            if docs:
-                self.collection.add(documents=docs, ids=ids)
-                logger.info(f" Loaded {len(docs)} document chunks")
+            db_path.mkdir(parents=True, exist_ok=True)
+            np.save(vectors_file, vecs)
+            docs_file.write_text(json.dumps(docs), encoding="utf-8")
+            logger.info(f" Loaded {len(docs)} document chunks")
     
     def search(self, query, top_k=3):
         """Search for relevant documents"""
-        if not self.collection:
+        if self.doc_vecs is None:
             return []
         
-        results = self.collection.query(
-            query_texts=[query],
-            n_results=top_k
-        )
+        q = self.embeddings.encode(query, convert_to_numpy=True).astype(np.float32)
+        q /= np.linalg.norm(q)
+        # Cosine similarity against every chunk at once
+        scores = self.doc_vecs @ q
         
-        return results['documents'][0] if results['documents'] else []
+        k = min(top_k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [self.docs[i] for i in top]
 
 # INFERENCE CLASS
 
@@ -87,49 +109,193 @@ class SimpleInference:
         
         # Load model
         self.tokenizer = AutoTokenizer.from_pretrained(model_path)
+        # BF16 on Ampere and newer GPUs, FP16 on older ones
+        if torch.cuda.is_available() and torch.cuda.is_bf16_supported():
+            dtype = torch.bfloat16
+        else:
+            dtype = torch.float16
         self.model = AutoModelForCausalLM.from_pretrained(
             model_path,
-            device_map="auto",
-            torch_dtype=torch.float16
+            device_map="cuda" if torch.cuda.is_available() else "auto",
+            torch_dtype=dtype,
+            attn_implementation="sdpa"
         )
         self.model.eval()
         logger.info(" Model loaded")
         
+        # Plain ints, so compiled graphs guard on constants rather than tensors
+        self.eos_token_id = int(self.tokenizer.eos_token_id)
+        self.pad_token_id = int(
+            self.tokenizer.pad_token_id
+            if self.tokenizer.pad_token_id is not None
+            else self.eos_token_id
+        )
+        
+        # Every generate() runs on this one long-lived thread. CUDA graphs
+        # from mode="reduce-overhead" are recorded per thread, so the warmup
+        # and later calls must share a thread to reuse them.
+        self._generator = ThreadPoolExecutor(max_workers=1, thread_name_prefix="generate")
+        
+        # Compile the forward pass used by every decode step. A short
+        # warmup generate pays the compile cost now instead of on the
+        # first question; if compiling fails we keep running eager.
+        eager_forward = self.model.forward
+        try:
+            self.model.forward = torch.compile(
+                eager_forward, mode="reduce-overhead", fullgraph=False, dynamic=True
+            )
+            warmup = self.tokenizer("Hello", return_tensors="pt").to(self.model.device)
+            self._run_generate(
+                **warmup,
+                max_new_tokens=4,
+                use_cache=True,
+                cache_implementation="static",
+                pad_token_id=self.pad_token_id,
+                eos_token_id=self.eos_token_id
+            )
+            logger.info(" Model compiled")
+        except Exception as e:
+            self.model.forward = eager_forward
+            logger.warning(f" torch.compile failed, using eager mode: {e}")
+        
         # Setup RAG if requested
         self.rag = None
         if use_rag:
             self.rag = SimpleRAG(docs_folder)
     
-    def generate(self, prompt, max_tokens=200, temperature=0.7):
-        """Generate text with optional RAG context"""
+    def _prepare_inputs(self, prompt, max_tokens):
+        """Add RAG context if available and tokenize the prompt"""
         
         # Get context from RAG if available
-        context = ""
         if self.rag:
             docs = self.rag.search(prompt)
             if docs:
-                context = "\n\n".join(docs)
+                context = self._build_context(docs, max_tokens)
                 prompt = f"Context:\n{context}\n\nQuestion: {prompt}\n\nAnswer:"
         
-        # Generate
-        inputs = self.tokenizer(prompt, return_tensors="pt").to(self.model.device)
+        return self._to_device(self.tokenizer(prompt, return_tensors="pt"))
+    
+    def _build_context(self, docs, max_tokens):
+        """Join retrieved docs, best first, until the token budget is used"""
         
-        with torch.no_grad():
-            outputs = self.model.generate(
-                **inputs,
-                max_new_tokens=max_tokens,
-                temperature=temperature,
-                do_sample=True,
-                pad_token_id=self.tokenizer.pad_token_id
-            )
+        # Leave room in the context window for the answer and the prompt text
+        max_positions = getattr(self.model.config, "max_position_embeddings", 2048)
+        budget = max_positions - max_tokens - 64
+        kept = []
+        used = 0
+        for doc in docs:
+            tokens = len(self.tokenizer.encode(doc, add_special_tokens=False))
+            if used + tokens > budget:
+                break
+            kept.append(doc)
+            used += tokens
+        return "\n\n".join(kept)
+    
+    def _to_device(self, encoding):
+        """Move tokenized inputs to the model's device"""
         
-        response = self.tokenizer.decode(outputs[0], skip_special_tokens=True)
+        # Copies from pinned host memory run asynchronously on the GPU
+        # stream, so the host can carry on while the prompt is uploaded
+        device = self.model.device
+        if device.type != "cuda":
+            return encoding.to(device)
+        return {
+            k: v.pin_memory().to(device, non_blocking=True)
+            for k, v in encoding.items()
+        }
+    
+    def _generation_kwargs(self, max_tokens, temperature):
+        """Decoding settings shared by generate() and generate_stream()"""
+        
+        # The static KV cache is sized once for prompt + max_tokens, so
+        # decode steps keep the same shapes and reuse the compiled graph
+        do_sample = temperature > 0
+        return dict(
+            max_new_tokens=max_tokens,
+            temperature=temperature if do_sample else None,
+            do_sample=do_sample,
+            num_beams=1,
+            use_cache=True,
+            cache_implementation="static",
+            pad_token_id=self.pad_token_id,
+            eos_token_id=self.eos_token_id
+        )
+    
+    def _run_generate(self, **kwargs):
+        """Run model.generate on the generation thread and wait for it"""
         
-        # Remove the prompt from response
-        if context:
-            response = response.split("Answer:")[-1].strip()
+        # inference_mode is per-thread, so it is entered on the worker
+        def run():
+            with torch.inference_mode():
+                return self.model.generate(**kwargs)
+        
+        return self._generator.submit(run).result()
+    
+    def generate(self, prompt, max_tokens=200, temperature=0.7):
+        """Generate text with optional RAG context (temperature=0 for greedy)"""
+        
+        inputs = self._prepare_inputs(prompt, max_tokens)
+        outputs = self._run_generate(
+            **inputs, **self._generation_kwargs(max_tokens, temperature)
+        )
+        
+        # Decode only the new tokens, leaving the prompt out of the response
+        prompt_len = inputs["input_ids"].shape[1]
+        response = self.tokenizer.decode(
+            outputs[0, prompt_len:], skip_special_tokens=True
+        ).strip()
         
         return response
+    
+    def generate_stream(self, prompt, max_tokens=200, temperature=0.7):
+        """Like generate(), but yields text pieces as they are decoded"""
+        
+        inputs = self._prepare_inputs(prompt, max_tokens)
+        streamer = TextIteratorStreamer(
+            self.tokenizer, skip_prompt=True, skip_special_tokens=True
+        )
+        kwargs = self._generation_kwargs(max_tokens, temperature)
+        
+        # Generation runs on the generation thread while this one reads text
+        def run():
+            with torch.inference_mode():
+                self.model.generate(**inputs, **kwargs, streamer=streamer)
+        
+        future = self._generator.submit(run)
+        yield from streamer
+        future.result()
+    
+    def generate_batch(self, prompts, max_tokens=200, temperature=0.7):
+        """Generate answers for several prompts in one generate() call"""
+        
+        # Decoder-only models continue from the right edge, so pad on the left
+        self.tokenizer.padding_side = "left"
+        if self.tokenizer.pad_token is None:
+            self.tokenizer.pad_token = self.tokenizer.eos_token
+        inputs = self._to_device(self.tokenizer(
+            prompts,
+            return_tensors="pt",
+            padding=True,
+            truncation=True
+        ))
+        
+        do_sample = temperature > 0
+        outputs = self._run_generate(
+            **inputs,
+            max_new_tokens=max_tokens,
+            temperature=temperature if do_sample else None,
+            do_sample=do_sample,
+            use_cache=True,
+            pad_token_id=self.pad_token_id,
+            eos_token_id=self.eos_token_id
+        )
+        
+        # Drop the (padded) prompt tokens before decoding
+        prompt_len = inputs["input_ids"].shape[1]
+        responses = self.tokenizer.batch_decode(
+            outputs[:, prompt_len:], skip_special_tokens=True
+        )
+        return [response.strip() for response in responses]
 
 # MAIN USAGE
 
@@ -161,17 +327,18 @@ def main():
         try:
             prompt = input("You: ").strip()
             
-            if prompt.lower() in ['quit', 'exit', 'q']:
+            if prompt.casefold() in EXIT_COMMANDS:
                 logger.info("Goodbye!")
                 break
             
             if not prompt:
                 continue
             
-            logger.info("Generating...")
-            response = inference.generate(prompt)
-            
-            print(f"\nAssistant: {response}\n")
+            # Print tokens as they are generated
+            print("\nAssistant: ", end="", flush=True)
+            for text in inference.generate_stream(prompt):
+                print(text, end="", flush=True)
+            print("\n")
             print("-" * 80 + "\n")
             
         except KeyboardInterrupt:
@@ -192,9 +359,9 @@ def batch_example():
         "How does fine-tuning work?"
     ]
     
-    for q in questions:
+    responses = inference.generate_batch(questions, max_tokens=150)
+    for q, response in zip(questions, responses):
         logger.info(f"\nQ: {q}")
-        response = inference.generate(q, max_tokens=150)
         logger.info(f"A: {response}\n")
 
 
@@ -316,22 +316,31 @@ Usage:
 
 import argparse
 import os
+import re
 import sys
 import logging
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from pathlib import Path
-from typing import List, Optional, Dict, TypedDict
+from typing import Annotated, AsyncIterator, List, Optional, Dict, TypedDict
 
+import torch
+from cachetools import LRUCache
 from dotenv import load_dotenv
 
 # LangChain / LangGraph imports
-from langchain_openai import ChatOpenAI, OpenAIEmbeddings
-from langchain_chroma import Chroma
+from langchain_openai import ChatOpenAI
+from langchain_community.embeddings import HuggingFaceEmbeddings
+from langchain_community.vectorstores import FAISS
+from langchain_community.vectorstores.utils import DistanceStrategy
 from langchain_community.document_loaders import PyPDFLoader
-from langchain_text_splitters import RecursiveCharacterTextSplitter
-from langchain_core.messages import HumanMessage, SystemMessage, BaseMessage
+from semantic_text_splitter import TextSplitter
+from langchain_core.documents import Document
+from langchain_core.messages import AIMessage, AIMessageChunk, HumanMessage, SystemMessage, BaseMessage
 from langchain_core.tools import tool
 from langgraph.checkpoint.memory import MemorySaver
 from langgraph.graph import START, END, StateGraph
+from langgraph.graph.message import add_messages
 from langgraph.prebuilt import create_react_agent
 
 
@@ -347,7 +356,8 @@ if not OPENAI_API_KEY:
 
 #  Paths 
 BASE_DIR = Path(__file__).resolve().parent
-CHROMA_DIR = BASE_DIR / "chroma_db"
+VECTOR_DIR = BASE_DIR / "faiss_index"
+VECTOR_INDEX = VECTOR_DIR / "index.faiss"
 PDF_FOLDER = BASE_DIR / "documents"  # Fixed: Use documents folder
 
 PDF_FILES = [
@@ -358,10 +368,15 @@ PDF_FILES = [
 
 #  Model settings 
 LLM_MODEL = os.getenv("LLM_MODEL", "gpt-4o-mini")
-EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "text-embedding-3-small")
+# Local 384-dim sentence embeddings; no API round-trip per chunk or query
+EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
+EMBEDDING_DEVICE = os.getenv("EMBEDDING_DEVICE") or ("cuda" if torch.cuda.is_available() else "cpu")
 CHUNK_SIZE = int(os.getenv("CHUNK_SIZE", "1000"))
 CHUNK_OVERLAP = int(os.getenv("CHUNK_OVERLAP", "150"))
 RETRIEVER_K = int(os.getenv("RETRIEVER_K", "4"))
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "256"))
+EMBED_WORKERS = int(os.getenv("EMBED_WORKERS", "2"))
+MAX_SESSIONS = int(os.getenv("MAX_SESSIONS", "1024"))
 
 #  Logging
 logging.basicConfig(
@@ -371,6 +386,9 @@ logging.basicConfig(
 )
 logger = logging.getLogger("legal-rag")
 
+# Citation markers written by search_documents, e.g. "[Source 1: LAW 243.pdf (page 3)]"
+_SOURCE_RE = re.compile(r'\[Source \d+: ([^\]]+)\]')
+
 
 
 #  State Definition
@@ -378,7 +396,60 @@ logger = logging.getLogger("legal-rag")
 
 class AgentState(TypedDict):
     """State schema for the agent graph"""
-    messages: List[BaseMessage]
+    # Appended to, so each turn sees the thread's earlier messages
+    messages: Annotated[List[BaseMessage], add_messages]
+
+
+
+#  Conversation Memory
+
+
+class _ThreadLRU(LRUCache):
+    """LRUCache of thread ids that reports each evicted id."""
+
+    def __init__(self, maxsize: int, on_evict):
+        super().__init__(maxsize=maxsize)
+        self._on_evict = on_evict
+
+    def popitem(self):
+        key, value = super().popitem()
+        self._on_evict(key)
+        return key, value
+
+
+class LRUMemorySaver(MemorySaver):
+    """MemorySaver that keeps only the `maxsize` most recently used threads."""
+
+    def __init__(self, maxsize: int = 1024):
+        super().__init__()
+        self._threads = _ThreadLRU(maxsize, self._drop_thread)
+        self._threads_lock = threading.Lock()
+
+    def _touch(self, config) -> None:
+        thread_id = config["configurable"]["thread_id"]
+        with self._threads_lock:
+            self._threads[thread_id] = True
+
+    def _drop_thread(self, thread_id: str) -> None:
+        self.delete_thread(thread_id)
+
+    def get_tuple(self, config):
+        self._touch(config)
+        return super().get_tuple(config)
+
+    def put(self, config, *args, **kwargs):
+        self._touch(config)
+        return super().put(config, *args, **kwargs)
+
+    # astream/ainvoke go through the async methods, which not every
+    # MemorySaver routes to get_tuple/put
+    async def aget_tuple(self, config):
+        self._touch(config)
+        return await super().aget_tuple(config)
+
+    async def aput(self, config, *args, **kwargs):
+        self._touch(config)
+        return await super().aput(config, *args, **kwargs)
 
 
 
@@ -402,7 +473,7 @@ def search_documents(query: str) -> str:
 
         results = []
         for i, doc in enumerate(docs, 1):
-            source = Path(doc.metadata.get("source", "unknown")).name
+            source = doc.metadata.get("basename") or Path(doc.metadata.get("source", "unknown")).name
             page = doc.metadata.get("page", "n/a")
             content = doc.page_content.strip()
             results.append(f"[Source {i}: {source} (page {page})]\n{content}\n")
@@ -417,6 +488,18 @@ def search_documents(query: str) -> str:
 #  Initialization Functions
 
 
+def _load_one_pdf(path: Path):
+    """Parse one PDF; runs in a worker process. Returns (pages, error)."""
+    try:
+        pages = PyPDFLoader(str(path)).load()
+        # Stored once here so search results need no path parsing per hit
+        for page in pages:
+            page.metadata["basename"] = path.name
+        return pages, None
+    except Exception as e:
+        return [], str(e)
+
+
 def load_and_split_documents() -> List:
     """Load all PDFs and split them into chunks."""
     if not PDF_FILES:
@@ -428,19 +511,24 @@ def load_and_split_documents() -> List:
 
     all_pages = []
 
+    paths = []
     for filename in PDF_FILES:
         path = PDF_FOLDER / filename
         if not path.is_file():
             logger.warning(f"File not found → {path}")
             continue
-
-        try:
-            loader = PyPDFLoader(str(path))
-            pages = loader.load()
+        paths.append(path)
+
+    # PDF parsing is CPU-bound, so each file gets its own process
+    if paths:
+        with ProcessPoolExecutor(max_workers=len(paths)) as pool:
+            results = list(pool.map(_load_one_pdf, paths))
+        for path, (pages, error) in zip(paths, results):
+            if error is not None:
+                logger.error(f"Failed to load {path.name}: {error}")
+                continue
             all_pages.extend(pages)
-            logger.info(f"Loaded {len(pages):3d} pages from {filename}")
-        except Exception as e:
-            logger.error(f"Failed to load {filename}: {e}")
+            logger.info(f"Loaded {len(pages):3d} pages from {path.name}")
 
     if not all_pages:
         logger.error("No pages were loaded from any PDF")
@@ -449,33 +537,65 @@ def load_and_split_documents() -> List:
 
     logger.info(f"Total pages loaded: {len(all_pages)}")
 
-    text_splitter = RecursiveCharacterTextSplitter(
-        chunk_size=CHUNK_SIZE,
-        chunk_overlap=CHUNK_OVERLAP,
-        separators=["\n\n", "\n", ".", " ", ""],
-        length_function=len,
-    )
+    # Rust splitter; capacity and overlap are in characters, and it breaks
+    # on the largest semantic unit that fits (paragraph, line, sentence, word)
+    text_splitter = TextSplitter(capacity=CHUNK_SIZE, overlap=CHUNK_OVERLAP)
 
-    chunks = text_splitter.split_documents(all_pages)
+    chunks = [
+        Document(page_content=text, metadata=dict(page.metadata))
+        for page in all_pages
+        for text in text_splitter.chunks(page.page_content)
+    ]
     logger.info(f"Created {len(chunks)} chunks (avg ~{CHUNK_SIZE} chars)")
 
     return chunks
 
 
+# Embedding model, loaded once and shared by ingest and retrieval
+_embeddings: Optional[HuggingFaceEmbeddings] = None
+
+
+def get_embeddings() -> HuggingFaceEmbeddings:
+    """Return the shared embedding model, loading it on first use."""
+    global _embeddings
+    if _embeddings is None:
+        _embeddings = HuggingFaceEmbeddings(
+            model_name=EMBEDDING_MODEL,
+            model_kwargs={"device": EMBEDDING_DEVICE},
+            encode_kwargs={"batch_size": 64, "normalize_embeddings": True},
+        )
+    return _embeddings
+
+
+def embed_texts(embeddings, texts: List[str]) -> List[List[float]]:
+    """Embed texts in batches of EMBED_BATCH_SIZE, sending the batches concurrently."""
+    batches = [texts[i:i + EMBED_BATCH_SIZE] for i in range(0, len(texts), EMBED_BATCH_SIZE)]
+    with ThreadPoolExecutor(max_workers=EMBED_WORKERS) as pool:
+        results = pool.map(embeddings.embed_documents, batches)
+        return [vector for batch in results for vector in batch]
+
+
 def build_vector_store(chunks):
-    """Create or load Chroma vector database."""
-    embeddings = OpenAIEmbeddings(model=EMBEDDING_MODEL)
+    """Create or load the FAISS vector index."""
+    embeddings = get_embeddings()
     
-    if CHROMA_DIR.exists() and any(CHROMA_DIR.iterdir()):
-        logger.info("Loading existing Chroma database...")
+    if VECTOR_INDEX.is_file():
+        logger.info("Loading existing FAISS index...")
         try:
-            vector_store = Chroma(
-                persist_directory=str(CHROMA_DIR),
-                embedding_function=embeddings,
+            # The index and its docstore pickle are written by this script
+            vector_store = FAISS.load_local(
+                str(VECTOR_DIR),
+                embeddings,
+                allow_dangerous_deserialization=True,
             )
-            # Verify it has documents
-            count = vector_store._collection.count()
-            logger.info(f"Loaded vector store with {count} documents")
+            # An index built with a different embedding model cannot be queried
+            dim = len(embeddings.embed_query("dimension check"))
+            if vector_store.index.d != dim:
+                raise ValueError(
+                    f"index has {vector_store.index.d}-dim vectors but {EMBEDDING_MODEL} "
+                    f"produces {dim}; run with --rebuild"
+                )
+            logger.info(f"Loaded vector store with {vector_store.index.ntotal} documents")
             return vector_store
         except Exception as e:
             logger.warning(f"Error loading existing database: {e}")
@@ -487,13 +607,20 @@ def build_vector_store(chunks):
         sys.exit(1)
     
     logger.info("Creating new vector database...")
-    CHROMA_DIR.mkdir(parents=True, exist_ok=True)
+    VECTOR_DIR.mkdir(parents=True, exist_ok=True)
     
-    vector_store = Chroma.from_documents(
-        documents=chunks,
-        embedding=embeddings,
-        persist_directory=str(CHROMA_DIR),
+    # Exact inner-product search (IndexFlatIP); the embeddings are unit
+    # length, so this ranks by cosine similarity
+    texts = [chunk.page_content for chunk in chunks]
+    vectors = embed_texts(embeddings, texts)
+    logger.info(f"Embedded {len(vectors)} chunks")
+    vector_store = FAISS.from_embeddings(
+        list(zip(texts, vectors)),
+        embeddings,
+        metadatas=[chunk.metadata for chunk in chunks],
+        distance_strategy=DistanceStrategy.MAX_INNER_PRODUCT,
     )
+    vector_store.save_local(str(VECTOR_DIR))
     logger.info("Vector store created and persisted")
 
     return vector_store
@@ -509,8 +636,8 @@ agent_executor = None
 compiled_agent = None
 
 
-def init_components(force_rebuild: bool = False):
-    """Initialize all system components"""
+def init_components(force_rebuild: bool = False, warmup: bool = True):
+    """Initialize all system components, optionally warming them up"""
     global llm, vector_store, retriever, agent_executor, compiled_agent
 
     logger.info("Initializing components...")
@@ -520,7 +647,7 @@ def init_components(force_rebuild: bool = False):
     logger.info(f"LLM initialized: {LLM_MODEL}")
 
     # Initialize or load vector store
-    if force_rebuild or not CHROMA_DIR.exists() or not any(CHROMA_DIR.iterdir()):
+    if force_rebuild or not VECTOR_INDEX.is_file():
         chunks = load_and_split_documents()
         vector_store = build_vector_store(chunks)
     else:
@@ -549,7 +676,8 @@ Be concise, accurate and professional.""")
         
         msgs = [sys_msg] + state["messages"]
         result = agent_executor.invoke({"messages": msgs})
-        return {"messages": result["messages"]}
+        # Only the messages this turn produced; the rest are already stored
+        return {"messages": result["messages"][len(msgs):]}
 
     # Create workflow
     workflow = StateGraph(AgentState)
@@ -558,9 +686,22 @@ Be concise, accurate and professional.""")
     workflow.add_edge("agent", END)
 
     # Compile with memory
-    memory = MemorySaver()
+    memory = LRUMemorySaver(maxsize=MAX_SESSIONS)
     compiled_agent = workflow.compile(checkpointer=memory)
     logger.info("Agent workflow compiled with memory")
+
+    # Run one search and one agent turn now, so the first real query does
+    # not pay for loading the embedding model or opening the LLM client
+    if warmup:
+        try:
+            retriever.invoke("warmup")
+            compiled_agent.invoke(
+                {"messages": [HumanMessage(content="ping")]},
+                config={"configurable": {"thread_id": "_warmup"}},
+            )
+            logger.info("Warmup query completed")
+        except Exception as e:
+            logger.warning(f"Warmup query failed: {e}")
     
     logger.info(" All components initialized successfully")
 
@@ -647,21 +788,54 @@ def query_agent(query: str, session_id: str) -> tuple:
     try:
         response = run_query(query, thread_id=session_id)
         
-        # Extract sources from response if present
-        sources = []
-        if "[Source" in response:
-            # Parse sources from the response
-            import re
-            source_pattern = r'\[Source \d+: ([^\]]+)\]'
-            matches = re.findall(source_pattern, response)
-            sources = matches
-        
-        return response, sources
+        return response, extract_sources(response)
     except Exception as e:
         logger.error(f"Error in query_agent: {e}")
         return f"Error: {str(e)}", []
 
 
+def session_has_history(session_id: str) -> bool:
+    """True once the session's agent memory holds at least one turn"""
+    agent = get_agent()
+    state = agent.get_state({"configurable": {"thread_id": session_id}})
+    return bool(state.values.get("messages"))
+
+
+def record_turn(session_id: str, query: str, response: str):
+    """Add a turn answered outside the agent (e.g. from a cache) to its memory"""
+    agent = get_agent()
+    agent.update_state(
+        {"configurable": {"thread_id": session_id}},
+        {"messages": [HumanMessage(content=query), AIMessage(content=response)]},
+        as_node="agent",
+    )
+
+
+def extract_sources(response: str) -> List[str]:
+    """Return the source citations found in a response"""
+    return _SOURCE_RE.findall(response) if "[Source" in response else []
+
+
+async def query_agent_stream(query: str, session_id: str) -> AsyncIterator[str]:
+    """
+    Query the agent and yield the answer text as the LLM produces it.
+    Pass the joined text to extract_sources() once the stream ends.
+    """
+    if compiled_agent is None:
+        init_components()
+
+    input_state = {"messages": [HumanMessage(content=query)]}
+    config = {"configurable": {"thread_id": session_id}}
+
+    # "messages" mode surfaces the token chunks of the LLM calls made inside
+    # the agent node; tool-call turns carry no text and are skipped
+    async for chunk, _metadata in compiled_agent.astream(
+        input_state, config=config, stream_mode="messages"
+    ):
+        if isinstance(chunk, AIMessageChunk) and isinstance(chunk.content, str) and chunk.content:
+            yield chunk.content
+
+
 
 #  Main CLI
 
@@ -677,7 +851,7 @@ def main():
     args = parser.parse_args()
 
     # Initialize once
-    init_components(force_rebuild=args.rebuild)
+    init_components(force_rebuild=args.rebuild, warmup=not args.init_db)
 
     if args.init_db:
         logger.info("Vector database initialization complete. Exiting.")
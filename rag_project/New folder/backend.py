@@ -536,18 +536,30 @@
 
 from fastapi import FastAPI, HTTPException, WebSocket, WebSocketDisconnect, Depends
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse, Response, StreamingResponse
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from pydantic import BaseModel, EmailStr
-from typing import Optional, List, Dict
-from datetime import datetime, timedelta
+from typing import AsyncIterator, Optional, List, Dict
+from datetime import datetime
+import asyncio
+import hashlib
+import os
 import uuid
-import json
+import base64
+from collections import deque
+import orjson
 import logging
-import hashlib
 import secrets
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
 
 # Import the RAG agent from app.py
-from app import query_agent, init_components
+from app import (
+    query_agent, query_agent_stream, extract_sources, init_components, get_embeddings,
+    session_has_history, record_turn,
+)
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -557,14 +569,23 @@ logger = logging.getLogger("backend")
 app = FastAPI(
     title="The Legal Vault NG",
     description="Agentic RAG system for querying Nigerian law documents with user authentication",
-    version="2.0.0"
+    version="2.0.0",
+    default_response_class=ORJSONResponse
 )
 
-# Add CORS middleware
+# Frontends allowed to call the API, as a comma-separated list
+CORS_ORIGINS = [
+    origin.strip()
+    for origin in os.getenv("CORS_ORIGINS", "http://localhost:3000").split(",")
+    if origin.strip()
+]
+
+# Add CORS middleware. Tokens travel in the Authorization header, not in
+# cookies, so credentials stay off
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=["*"],
-    allow_credentials=True,
+    allow_origins=CORS_ORIGINS,
+    allow_credentials=False,
     allow_methods=["*"],
     allow_headers=["*"],
 )
@@ -572,6 +593,28 @@ app.add_middleware(
 # Security
 security = HTTPBearer()
 
+# Messages kept per user; older ones drop off as new ones arrive
+MAX_HISTORY_MESSAGES = 50
+
+# Shared by every stored message without sources; immutable, so never copied
+NO_SOURCES = ()
+
+# Shared user/session store for multi-worker deployments; in-process when unset
+REDIS_URL = os.getenv("REDIS_URL")
+TOKEN_TTL_SECONDS = int(os.getenv("TOKEN_TTL_SECONDS", str(7 * 24 * 3600)))
+
+# Authenticated requests refresh last_active at most this often (seconds)
+LAST_ACTIVE_INTERVAL = 60
+
+# Threads that run blocking agent calls off the event loop
+QUERY_WORKERS = int(os.getenv("QUERY_WORKERS", "8"))
+
+# Most queries accepted by one /query/batch request
+MAX_BATCH_QUERIES = 16
+
+# LLM chunks grouped into each streamed frame
+STREAM_GROUP_SIZE = 5
+
 #  Data Models
 
 class UserRegistration(BaseModel):
@@ -604,6 +647,10 @@ class QueryRequest(BaseModel):
     """Model for incoming query request"""
     query: str
 
+class BatchQueryRequest(BaseModel):
+    """Model for several queries answered in one request"""
+    queries: List[str]
+
 class QueryResponse(BaseModel):
     """Model for query response"""
     query: str
@@ -625,50 +672,91 @@ class ConversationHistory(BaseModel):
     messages: List[ChatMessage]
     total_messages: int
 
+#  Session IDs and Tokens
+
+# Random values are generated in batches from a single read of the system
+# RNG; popleft on a deque is atomic, so request threads share the pools
+ID_POOL_SIZE = 1024
+_token_pool = deque()
+_session_id_pool = deque()
+
+def _refill_ids():
+    raw = secrets.token_bytes(48 * ID_POOL_SIZE)
+    for i in range(0, len(raw), 48):
+        # 32 bytes -> same shape as secrets.token_urlsafe(32)
+        _token_pool.append(base64.urlsafe_b64encode(raw[i:i + 32]).rstrip(b"=").decode())
+        _session_id_pool.append(str(uuid.UUID(bytes=raw[i + 32:i + 48], version=4)))
+
+def new_token() -> str:
+    while True:
+        try:
+            return _token_pool.popleft()
+        except IndexError:
+            _refill_ids()
+
+def new_session_id() -> str:
+    while True:
+        try:
+            return _session_id_pool.popleft()
+        except IndexError:
+            _refill_ids()
+
 #  User Management
 
 class UserManager:
-    """Manage user accounts and authentication"""
+    """
+    Manage user accounts and authentication in memory. Methods are async
+    so callers treat this and RedisUserManager the same way.
+    """
     
     def __init__(self):
         self.users: Dict[str, Dict] = {}  # email -> user_data
         self.sessions: Dict[str, str] = {}  # session_id -> email
         self.tokens: Dict[str, str] = {}  # token -> email
+        # Guards writes to the three dicts above; reads are single dict.get
+        # calls and stay lock-free
+        self._lock = threading.Lock()
+        # email -> time.monotonic() of the last last_active write
+        self._last_touch: Dict[str, float] = {}
     
-    def create_user(self, email: str, name: Optional[str] = None) -> tuple[str, str]:
+    async def create_user(self, email: str, name: Optional[str] = None) -> tuple[str, str]:
         """
         Create a new user account
         
         Returns:
             tuple: (session_id, token)
         """
-        # Check if user already exists
-        if email in self.users:
-            raise ValueError("User with this email already exists")
-        
         # Generate unique session_id and token
-        session_id = str(uuid.uuid4())
-        token = secrets.token_urlsafe(32)
+        session_id = new_session_id()
+        token = new_token()
+        now = datetime.now().isoformat()
         
-        # Create user
-        self.users[email] = {
+        user = {
             "email": email,
             "name": name,
             "session_id": session_id,
             "token": token,
-            "created_at": datetime.now().isoformat(),
-            "last_active": datetime.now().isoformat(),
-            "messages": []
+            "created_at": now,
+            "last_active": now,
+            "messages": deque(maxlen=MAX_HISTORY_MESSAGES),
+            # /stats fields, cleared whenever the fields it shows change
+            "_stats_cache": None
         }
         
-        # Map session and token to email
-        self.sessions[session_id] = email
-        self.tokens[token] = email
+        with self._lock:
+            # Check if user already exists
+            if email in self.users:
+                raise ValueError("User with this email already exists")
+            
+            # Create user and map session and token to email
+            self.users[email] = user
+            self.sessions[session_id] = email
+            self.tokens[token] = email
         
         logger.info(f"Created user: {email} with session: {session_id}")
         return session_id, token
     
-    def login_user(self, email: str, session_id: str) -> str:
+    async def login_user(self, email: str, session_id: str) -> str:
         """
         Login user with email and session_id
         
@@ -685,15 +773,18 @@ class UserManager:
             raise ValueError("Invalid session ID")
         
         # Generate new token for this login
-        token = secrets.token_urlsafe(32)
-        user["token"] = token
-        user["last_active"] = datetime.now().isoformat()
-        self.tokens[token] = email
+        token = new_token()
+        last_active = datetime.now().isoformat()
+        with self._lock:
+            user["token"] = token
+            user["last_active"] = last_active
+            user["_stats_cache"] = None
+            self.tokens[token] = email
         
         logger.info(f"User logged in: {email}")
         return token
     
-    def verify_token(self, token: str) -> Optional[str]:
+    async def verify_token(self, token: str) -> Optional[str]:
         """
         Verify authentication token
         
@@ -702,46 +793,327 @@ class UserManager:
         """
         return self.tokens.get(token)
     
-    def get_user_by_email(self, email: str) -> Optional[Dict]:
+    async def get_user_by_email(self, email: str) -> Optional[Dict]:
         """Get user data by email"""
         return self.users.get(email)
     
-    def get_user_by_token(self, token: str) -> Optional[Dict]:
+    async def get_user_by_token(self, token: str) -> Optional[Dict]:
         """Get user data by token"""
         email = self.tokens.get(token)
         if email:
             return self.users.get(email)
         return None
     
-    def add_message(self, email: str, role: str, content: str, sources: Optional[List[str]] = None):
+    async def add_message(self, email: str, role: str, content: str, sources: Optional[List[str]] = None):
         """Add a message to user's conversation history"""
         if email not in self.users:
             return False
         
+        # One timestamp for both the message and the user's last activity
+        now = datetime.now().isoformat()
         message = {
             "role": role,
             "content": content,
-            "timestamp": datetime.now().isoformat(),
-            "sources": sources or []
+            "timestamp": now,
+            "sources": sources or NO_SOURCES
         }
         
-        self.users[email]["messages"].append(message)
-        self.users[email]["last_active"] = datetime.now().isoformat()
+        with self._lock:
+            self.users[email]["messages"].append(message)
+            self.users[email]["last_active"] = now
+            self.users[email]["_stats_cache"] = None
         return True
     
-    def get_conversation_history(self, email: str) -> Optional[List[Dict]]:
-        """Get all messages for a user"""
+    async def get_conversation_history(self, email: str) -> Optional[List[Dict]]:
+        """Get the user's most recent messages (up to MAX_HISTORY_MESSAGES)"""
         if email not in self.users:
             return None
-        return self.users[email]["messages"]
+        # Copied under the lock: agent threads may append while we read
+        with self._lock:
+            return list(self.users[email]["messages"])
+    
+    async def message_count(self, email: str) -> int:
+        """Number of messages in the user's history"""
+        user = self.users.get(email)
+        return len(user["messages"]) if user else 0
     
-    def update_last_active(self, email: str):
-        """Update user's last active timestamp"""
+    async def update_last_active(self, email: str):
+        """Update user's last active timestamp, at most once per LAST_ACTIVE_INTERVAL"""
+        now = time.monotonic()
+        if now - self._last_touch.get(email, float("-inf")) < LAST_ACTIVE_INTERVAL:
+            return
+        self._last_touch[email] = now
         if email in self.users:
             self.users[email]["last_active"] = datetime.now().isoformat()
+            self.users[email]["_stats_cache"] = None
+
+class RedisUserManager:
+    """
+    UserManager backed by Redis (through redis.asyncio, so round-trips
+    don't block the event loop). Users, tokens and history survive restarts
+    and are shared between workers; agent memory, the semantic cache and
+    the /stats cache are still per process.
+    
+    Keys:
+        user:{email}      hash of the user's fields
+        session:{id}      email
+        token:{token}     email, expires after TOKEN_TTL_SECONDS
+        messages:{email}  list of JSON messages, trimmed to MAX_HISTORY_MESSAGES
+    """
+    
+    def __init__(self, client):
+        self.redis = client
+        # email -> time.monotonic() of this worker's last last_active write
+        self._last_touch: Dict[str, float] = {}
+    
+    async def create_user(self, email: str, name: Optional[str] = None) -> tuple[str, str]:
+        """Create a new user account; returns (session_id, token)"""
+        session_id = new_session_id()
+        token = new_token()
+        now = datetime.now().isoformat()
+        
+        # HSETNX claims the email atomically across workers
+        if not await self.redis.hsetnx(f"user:{email}", "email", email):
+            raise ValueError("User with this email already exists")
+        
+        pipe = self.redis.pipeline()
+        pipe.hset(f"user:{email}", mapping={
+            "name": name or "",
+            "session_id": session_id,
+            "token": token,
+            "created_at": now,
+            "last_active": now,
+        })
+        pipe.set(f"session:{session_id}", email)
+        pipe.set(f"token:{token}", email, ex=TOKEN_TTL_SECONDS)
+        await pipe.execute()
+        
+        logger.info(f"Created user: {email} with session: {session_id}")
+        return session_id, token
+    
+    async def login_user(self, email: str, session_id: str) -> str:
+        """Login user with email and session_id; returns a new token"""
+        stored_session = await self.redis.hget(f"user:{email}", "session_id")
+        if stored_session is None:
+            raise ValueError("User not found")
+        if stored_session != session_id:
+            raise ValueError("Invalid session ID")
+        
+        token = new_token()
+        pipe = self.redis.pipeline()
+        pipe.hset(f"user:{email}", mapping={
+            "token": token,
+            "last_active": datetime.now().isoformat(),
+        })
+        pipe.set(f"token:{token}", email, ex=TOKEN_TTL_SECONDS)
+        await pipe.execute()
+        
+        logger.info(f"User logged in: {email}")
+        return token
+    
+    async def verify_token(self, token: str) -> Optional[str]:
+        """Return the token's email if valid, None otherwise"""
+        return await self.redis.get(f"token:{token}")
+    
+    async def get_user_by_email(self, email: str) -> Optional[Dict]:
+        """Get user fields by email (history is read separately)"""
+        user = await self.redis.hgetall(f"user:{email}")
+        if not user:
+            return None
+        user["name"] = user.get("name") or None
+        return user
+    
+    async def get_user_by_token(self, token: str) -> Optional[Dict]:
+        """Get user data by token"""
+        email = await self.verify_token(token)
+        return await self.get_user_by_email(email) if email else None
+    
+    async def add_message(self, email: str, role: str, content: str, sources: Optional[List[str]] = None):
+        """Append a message and trim the history, in one round-trip"""
+        now = datetime.now().isoformat()
+        message = orjson.dumps({
+            "role": role,
+            "content": content,
+            "timestamp": now,
+            "sources": sources or []
+        })
+        pipe = self.redis.pipeline()
+        pipe.rpush(f"messages:{email}", message)
+        pipe.ltrim(f"messages:{email}", -MAX_HISTORY_MESSAGES, -1)
+        pipe.hset(f"user:{email}", "last_active", now)
+        await pipe.execute()
+        return True
+    
+    async def get_conversation_history(self, email: str) -> Optional[List[Dict]]:
+        """Get the user's most recent messages (up to MAX_HISTORY_MESSAGES)"""
+        if not await self.redis.exists(f"user:{email}"):
+            return None
+        return [orjson.loads(m) for m in await self.redis.lrange(f"messages:{email}", 0, -1)]
+    
+    async def message_count(self, email: str) -> int:
+        """Number of messages in the user's history"""
+        return await self.redis.llen(f"messages:{email}")
+    
+    async def update_last_active(self, email: str):
+        """Update user's last active timestamp, at most once per LAST_ACTIVE_INTERVAL"""
+        now = time.monotonic()
+        if now - self._last_touch.get(email, float("-inf")) < LAST_ACTIVE_INTERVAL:
+            return
+        self._last_touch[email] = now
+        await self.redis.hset(f"user:{email}", "last_active", datetime.now().isoformat())
 
 # Initialize user manager
-user_manager = UserManager()
+if REDIS_URL:
+    import redis.asyncio as aioredis
+    user_manager = RedisUserManager(aioredis.Redis.from_url(REDIS_URL, decode_responses=True))
+    logger.info("User store: Redis")
+else:
+    user_manager = UserManager()
+
+#  Semantic Response Cache
+
+class SemanticCache:
+    """
+    Recent answers, looked up by embedding similarity of the query.
+    Shared by all users, so it only holds and serves the opening question of
+    a session: later turns depend on that session's conversation.
+    """
+    
+    def __init__(self, maxsize: int = 1024, threshold: float = 0.90):
+        self.maxsize = maxsize
+        self.threshold = threshold
+        self._vectors: Optional[np.ndarray] = None  # (maxsize, dim) float32, unit rows
+        self._entries: List[Optional[tuple]] = [None] * maxsize  # (response, sources)
+        self._last_used = np.zeros(maxsize, dtype=np.int64)  # 0 = empty slot
+        self._clock = 0
+        self._lock = threading.Lock()
+    
+    def embed(self, query: str) -> np.ndarray:
+        """Embed a query with the RAG system's embedding model"""
+        vector = np.asarray(get_embeddings().embed_query(query), dtype=np.float32)
+        return vector / np.linalg.norm(vector)
+    
+    def lookup(self, vector: np.ndarray) -> Optional[tuple]:
+        """Return (response, sources) of the closest cached query, if close enough"""
+        with self._lock:
+            if self._vectors is None:
+                return None
+            # Cosine similarity against every cached query in one product
+            scores = self._vectors @ vector
+            scores[self._last_used == 0] = -1.0
+            best = int(np.argmax(scores))
+            if scores[best] < self.threshold:
+                return None
+            self._clock += 1
+            self._last_used[best] = self._clock
+            return self._entries[best]
+    
+    def add(self, vector: np.ndarray, response_text: str, sources: List[str]):
+        """Cache an answer, replacing the least recently used one when full"""
+        with self._lock:
+            if self._vectors is None:
+                self._vectors = np.zeros((self.maxsize, vector.shape[0]), dtype=np.float32)
+            slot = int(np.argmin(self._last_used))
+            self._clock += 1
+            self._vectors[slot] = vector
+            self._entries[slot] = (response_text, sources)
+            self._last_used[slot] = self._clock
+
+semantic_cache = SemanticCache()
+
+def is_cacheable(response_text: str) -> bool:
+    """query_agent reports failures as "Error: ..." text; those and empty answers are not kept"""
+    return bool(response_text.strip()) and not response_text.startswith("Error:")
+
+def answer_query(query: str, session_id: str) -> tuple[str, List[str]]:
+    """Answer a session's first question from the semantic cache if possible, else run the agent"""
+    if session_has_history(session_id):
+        return query_agent(query, session_id)
+    
+    vector = semantic_cache.embed(query)
+    cached = semantic_cache.lookup(vector)
+    if cached is not None:
+        logger.info("Semantic cache hit")
+        # Keep the turn in the agent's memory so follow-ups can refer to it
+        record_turn(session_id, query, cached[0])
+        return cached
+    
+    response_text, sources = query_agent(query, session_id)
+    if is_cacheable(response_text):
+        semantic_cache.add(vector, response_text, sources)
+    return response_text, sources
+
+
+class QueryCoalescer:
+    """
+    Shares one answer_query run between identical queries in flight at once
+    on the same session (e.g. a resubmitted request); different sessions
+    never share a run, since answers depend on each session's conversation.
+    """
+    
+    def __init__(self):
+        self._inflight: Dict[str, asyncio.Future] = {}
+    
+    async def answer(self, query: str, session_id: str) -> tuple[str, List[str]]:
+        key = hashlib.sha1(f"{session_id}\0{query}".encode()).hexdigest()
+        future = self._inflight.get(key)
+        if future is None:
+            future = asyncio.get_running_loop().run_in_executor(
+                None, answer_query, query, session_id
+            )
+            self._inflight[key] = future
+            future.add_done_callback(lambda _: self._inflight.pop(key, None))
+        else:
+            logger.info("Joining in-flight query")
+        # Shielded so one client disconnecting does not cancel the others
+        return await asyncio.shield(future)
+
+
+query_coalescer = QueryCoalescer()
+
+async def answer_stream(query: str, session_id: str) -> AsyncIterator[Dict]:
+    """
+    Stream the agent's answer; a session's first question may come from the
+    semantic cache instead (see answer_query). Yields {"delta": ...} payloads
+    as text arrives, then one closing
+    {"done": True, "response": ..., "sources": [...], "timestamp": ...}.
+    """
+    loop = asyncio.get_running_loop()
+    first_turn = not session_has_history(session_id)
+    vector = None
+    cached = None
+    if first_turn:
+        vector = await loop.run_in_executor(None, semantic_cache.embed, query)
+        cached = semantic_cache.lookup(vector)
+    if cached is not None:
+        logger.info("Semantic cache hit")
+        response_text, sources = cached
+        record_turn(session_id, query, response_text)
+        yield {"delta": response_text}
+    else:
+        # Forward the chunks a few at a time and keep the full text for the
+        # history and the cache
+        chunks = []
+        pending = []
+        async for chunk in query_agent_stream(query, session_id):
+            chunks.append(chunk)
+            pending.append(chunk)
+            if len(pending) >= STREAM_GROUP_SIZE:
+                yield {"delta": "".join(pending)}
+                pending.clear()
+        if pending:
+            yield {"delta": "".join(pending)}
+        response_text = "".join(chunks).strip()
+        sources = extract_sources(response_text)
+        if first_turn and is_cacheable(response_text):
+            semantic_cache.add(vector, response_text, sources)
+    
+    yield {
+        "done": True,
+        "response": response_text,
+        "sources": sources,
+        "timestamp": datetime.now().isoformat()
+    }
 
 #  Authentication Dependency
 
@@ -753,12 +1125,12 @@ async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(s
         str: user email
     """
     token = credentials.credentials
-    email = user_manager.verify_token(token)
+    email = await user_manager.verify_token(token)
     
     if not email:
         raise HTTPException(status_code=401, detail="Invalid or expired token")
     
-    user_manager.update_last_active(email)
+    await user_manager.update_last_active(email)
     return email
 
 #  Application Lifecycle
@@ -767,6 +1139,9 @@ async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(s
 async def startup_event():
     """Initialize the RAG system on startup"""
     logger.info(" Starting Nigerian Law RAG API...")
+    asyncio.get_running_loop().set_default_executor(
+        ThreadPoolExecutor(max_workers=QUERY_WORKERS, thread_name_prefix="query")
+    )
     try:
         init_components()
         logger.info(" RAG system initialized successfully")
@@ -827,17 +1202,18 @@ async def register_user(registration: UserRegistration):
         AuthResponse with session_id and token
     """
     try:
-        session_id, token = user_manager.create_user(
+        session_id, token = await user_manager.create_user(
             email=registration.email,
             name=registration.name
         )
+        user = await user_manager.get_user_by_email(registration.email)
         
         return AuthResponse(
             session_id=session_id,
             email=registration.email,
             name=registration.name,
             token=token,
-            created_at=datetime.now().isoformat(),
+            created_at=user["created_at"],
             message="Account created successfully"
         )
     
@@ -859,8 +1235,8 @@ async def login_user(login: UserLogin):
         AuthResponse with new authentication token
     """
     try:
-        token = user_manager.login_user(login.email, login.session_id)
-        user = user_manager.get_user_by_email(login.email)
+        token = await user_manager.login_user(login.email, login.session_id)
+        user = await user_manager.get_user_by_email(login.email)
         
         return AuthResponse(
             session_id=user["session_id"],
@@ -901,7 +1277,13 @@ async def login_user(login: UserLogin):
 
 #  Query Endpoints
 
-@app.post("", response_model=QueryResponse, tags=["Query"])
+# The hot endpoints below return plain dicts shaped like QueryResponse and
+# ConversationHistory, without response_model: the data is built here, so
+# FastAPI's second validation pass would only re-check it. The auth
+# endpoints keep response_model for strict schema enforcement.
+
+@app.post("", tags=["Query"])
+@app.post("/chat", tags=["Chat"])
 async def query_documents(
     request: QueryRequest,
     email: str = Depends(get_current_user)
@@ -917,41 +1299,103 @@ async def query_documents(
         QueryResponse with answer and sources
     """
     try:
-        user = user_manager.get_user_by_email(email)
+        timestamp = datetime.now().isoformat()
+        user = await user_manager.get_user_by_email(email)
         session_id = user["session_id"]
         
         # Store user query
-        user_manager.add_message(email, "user", request.query)
+        await user_manager.add_message(email, "user", request.query)
         
         # Query the agent
         logger.info(f"Processing query for user {email}: {request.query[:50]}...")
-        response_text, sources = query_agent(request.query, session_id)
+        # The agent blocks on the LLM; it runs in a worker thread so the
+        # event loop keeps serving other requests meanwhile
+        response_text, sources = await query_coalescer.answer(request.query, session_id)
         
         # Store assistant response
-        user_manager.add_message(email, "assistant", response_text, sources)
+        await user_manager.add_message(email, "assistant", response_text, sources)
         
-        return QueryResponse(
-            query=request.query,
-            response=response_text,
-            sources=sources,
-            timestamp=datetime.now().isoformat()
-        )
+        return {
+            "query": request.query,
+            "response": response_text,
+            "sources": sources,
+            "timestamp": timestamp
+        }
     
     except Exception as e:
         logger.error(f"Error processing query: {e}")
         raise HTTPException(status_code=500, detail=f"Error processing query: {str(e)}")
 
-# @app.post("/chat", response_model=QueryResponse, tags=["Chat"])
-# async def chat(
-#     request: QueryRequest,
-#     email: str = Depends(get_current_user)
-# ):
-#     """
-#     Chat endpoint (alias for /query)
-#     """
-#     return await query_documents(request, email)
+@app.post("/query/stream", tags=["Query"])
+async def query_documents_stream(
+    request: QueryRequest,
+    email: str = Depends(get_current_user)
+):
+    """
+    Query the documents and stream the answer as Server-Sent Events.
+    Each event's data is a JSON payload from answer_stream; a failure
+    ends the stream with an {"error": ...} event.
+    """
+    user = await user_manager.get_user_by_email(email)
+    session_id = user["session_id"]
+    
+    # Store user query
+    await user_manager.add_message(email, "user", request.query)
+    logger.info(f"Streaming query for user {email}: {request.query[:50]}...")
+    
+    async def events():
+        try:
+            async for payload in answer_stream(request.query, session_id):
+                if payload.get("done"):
+                    await user_manager.add_message(email, "assistant", payload["response"], payload["sources"])
+                yield b"data: " + orjson.dumps(payload) + b"\n\n"
+        except Exception as e:
+            logger.error(f"Error streaming query: {e}")
+            yield b"data: " + orjson.dumps({"error": f"Error: {str(e)}"}) + b"\n\n"
+    
+    return StreamingResponse(events(), media_type="text/event-stream")
 
-@app.get("", response_model=ConversationHistory, tags=["History"])
+@app.post("/query/batch", tags=["Query"])
+async def query_documents_batch(
+    request: BatchQueryRequest,
+    email: str = Depends(get_current_user)
+):
+    """
+    Answer several queries in one request, with one auth check.
+    Queries run in order on the user's session, so the conversation
+    history stays in the order they were asked.
+    """
+    if not request.queries:
+        raise HTTPException(status_code=400, detail="At least one query is required")
+    if len(request.queries) > MAX_BATCH_QUERIES:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BATCH_QUERIES} queries per batch")
+    
+    try:
+        timestamp = datetime.now().isoformat()
+        user = await user_manager.get_user_by_email(email)
+        session_id = user["session_id"]
+        
+        logger.info(f"Processing batch of {len(request.queries)} queries for user {email}")
+        
+        results = []
+        for query in request.queries:
+            await user_manager.add_message(email, "user", query)
+            response_text, sources = await query_coalescer.answer(query, session_id)
+            await user_manager.add_message(email, "assistant", response_text, sources)
+            results.append({
+                "query": query,
+                "response": response_text,
+                "sources": sources,
+                "timestamp": timestamp
+            })
+        
+        return {"results": results}
+    
+    except Exception as e:
+        logger.error(f"Error processing query batch: {e}")
+        raise HTTPException(status_code=500, detail=f"Error processing query batch: {str(e)}")
+
+@app.get("", tags=["History"])
 async def get_conversation_history(email: str = Depends(get_current_user)):
     """
     Get conversation history for current user
@@ -959,17 +1403,15 @@ async def get_conversation_history(email: str = Depends(get_current_user)):
     Returns:
         ConversationHistory with all messages
     """
-    messages_data = user_manager.get_conversation_history(email)
+    messages_data = await user_manager.get_conversation_history(email)
     
     if messages_data is None:
         raise HTTPException(status_code=404, detail="User not found")
     
-    messages = [ChatMessage(**msg) for msg in messages_data]
-    
-    return ConversationHistory(
-        messages=messages,
-        total_messages=len(messages)
-    )
+    return {
+        "messages": messages_data,
+        "total_messages": len(messages_data)
+    }
 
 # @app.delete("", tags=["History"])
 # async def clear_conversation_history(email: str = Depends(get_current_user)):
@@ -989,21 +1431,35 @@ async def get_conversation_history(email: str = Depends(get_current_user)):
 @app.get("", tags=["System"])
 async def get_stats(email: str = Depends(get_current_user)):
     """Get user statistics"""
-    user = user_manager.get_user_by_email(email)
+    user = await user_manager.get_user_by_email(email)
     
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
-    return {
-        "message_count": len(user["messages"]),
-        "user_since": user["created_at"],
-        "last_active": user["last_active"],
-        "documents": ["LAW 243", "Banking & Insurance Law", "Oil & Gas Law"],
-        "timestamp": datetime.now().isoformat()
-    }
+    # Everything but the timestamp only changes on writes to this user, so
+    # it is built once and reused. Redis users are fresh dicts per request,
+    # so they never hit this cache.
+    stats = user.get("_stats_cache")
+    if stats is None:
+        stats = {
+            "message_count": await user_manager.message_count(email),
+            "user_since": user["created_at"],
+            "last_active": user["last_active"],
+            "documents": ["LAW 243", "Banking & Insurance Law", "Oil & Gas Law"],
+        }
+        user["_stats_cache"] = stats
+    
+    return Response(
+        orjson.dumps({**stats, "timestamp": datetime.now().isoformat()}),
+        media_type="application/json"
+    )
 
 #  WebSocket Support
 
+async def send_payload(websocket: WebSocket, payload: Dict):
+    """Send a JSON text frame, encoded with orjson"""
+    await websocket.send_text(orjson.dumps(payload).decode())
+
 @app.websocket("/ws")
 async def websocket_endpoint(websocket: WebSocket, token: str):
     """
@@ -1012,15 +1468,16 @@ async def websocket_endpoint(websocket: WebSocket, token: str):
     Usage:
         Connect to ws://localhost:8000/ws?token=YOUR_TOKEN
         Send: {"query": "Your question"}
-        Receive: {"response": "...", "sources": [...]}
+        Receive: {"delta": "..."} frames as the answer is generated, then
+                 {"done": true, "response": "...", "sources": [...]}
     """
     # Verify token
-    email = user_manager.verify_token(token)
+    email = await user_manager.verify_token(token)
     if not email:
         await websocket.close(code=1008, reason="Invalid token")
         return
     
-    user = user_manager.get_user_by_email(email)
+    user = await user_manager.get_user_by_email(email)
     session_id = user["session_id"]
     
     await websocket.accept()
@@ -1030,33 +1487,27 @@ async def websocket_endpoint(websocket: WebSocket, token: str):
         while True:
             # Receive message
             data = await websocket.receive_text()
-            message = json.loads(data)
+            message = orjson.loads(data)
             query = message.get("query")
             
             if not query:
-                await websocket.send_json({"error": "Query is required"})
+                await send_payload(websocket, {"error": "Query is required"})
                 continue
             
             # Store user query
-            user_manager.add_message(email, "user", query)
+            await user_manager.add_message(email, "user", query)
             
             # Process query
             try:
-                response_text, sources = query_agent(query, session_id)
-                
-                # Store assistant response
-                user_manager.add_message(email, "assistant", response_text, sources)
-                
-                # Send response
-                await websocket.send_json({
-                    "response": response_text,
-                    "sources": sources,
-                    "timestamp": datetime.now().isoformat()
-                })
+                async for payload in answer_stream(query, session_id):
+                    if payload.get("done"):
+                        # Store assistant response before the closing frame
+                        await user_manager.add_message(email, "assistant", payload["response"], payload["sources"])
+                    await send_payload(websocket, payload)
             
             except Exception as e:
                 logger.error(f"Error processing WebSocket query: {e}")
-                await websocket.send_json({"error": f"Error: {str(e)}"})
+                await send_payload(websocket, {"error": f"Error: {str(e)}"})
     
     except WebSocketDisconnect:
         logger.info(f"WebSocket disconnected for user: {email}")
@@ -9,10 +9,19 @@ import sys
 import subprocess
 from pathlib import Path
 
+import uvicorn
+
+def write_block(*lines):
+    """Write several lines to stdout in one call"""
+    sys.stdout.write("\n".join(lines) + "\n")
+    sys.stdout.flush()
+
 def print_banner():
-    print("\n" + "="*70)
-    print("  Nigerian Law RAG System - Quick Start")
-    print("="*70 + "\n")
+    write_block(
+        "\n" + "="*70,
+        "  Nigerian Law RAG System - Quick Start",
+        "="*70 + "\n",
+    )
 
 def check_env_file():
     """Check if .env file exists"""
@@ -26,7 +35,7 @@ OPENAI_API_KEY=your_openai_api_key_here
 
 # LLM Configuration
 LLM_MODEL=gpt-4o-mini
-EMBEDDING_MODEL=text-embedding-3-small
+EMBEDDING_MODEL=sentence-transformers/all-MiniLM-L6-v2
 
 # Document Processing
 CHUNK_SIZE=1000
@@ -81,9 +90,9 @@ def check_documents():
 
 def check_vector_db():
     """Check if vector database exists"""
-    chroma_path = Path("chroma_db")
+    index_path = Path("faiss_index") / "index.faiss"
     
-    if not chroma_path.exists() or not any(chroma_path.iterdir()):
+    if not index_path.is_file():
         print("\n Vector database not found")
         print("   Initializing vector database...")
         
@@ -97,28 +106,55 @@ def check_vector_db():
     else:
         print(" Vector database found")
 
+def event_loop():
+    """uvloop where it is installed (not on Windows), else plain asyncio"""
+    try:
+        import uvloop  # noqa: F401
+        return "uvloop"
+    except ImportError:
+        return "asyncio"
+
+def worker_count():
+    """
+    Number of uvicorn workers; 1 unless WORKERS is set. Agent memory and the
+    loaded models are per process even with REDIS_URL, so a conversation
+    only keeps its context when every request lands on the same worker.
+    """
+    return int(os.getenv("WORKERS", "1"))
+
 def start_server():
     """Start the FastAPI server"""
-    print("\n" + "="*70)
-    print("  Starting FastAPI Server")
-    print("="*70)
-    print("\n Server will be available at:")
-    print("   • API Docs:  http://localhost:8000/docs")
-    print("   • ReDoc:     http://localhost:8000/redoc")
-    print("   • Base URL:  http://localhost:8000")
-    print("\n  Press Ctrl+C to stop the server")
-    print("="*70 + "\n")
+    write_block(
+        "\n" + "="*70,
+        "  Starting FastAPI Server",
+        "="*70,
+        "\n Server will be available at:",
+        "   • API Docs:  http://localhost:8000/docs",
+        "   • ReDoc:     http://localhost:8000/redoc",
+        "   • Base URL:  http://localhost:8000",
+        "\n  Press Ctrl+C to stop the server",
+        "="*70 + "\n",
+    )
+    
+    options = {
+        "host": "0.0.0.0",
+        "port": 8000,
+        "loop": event_loop(),
+        "http": "httptools",
+    }
+    if os.getenv("DEV"):
+        # Auto-reload on code changes; development only
+        options["reload"] = True
+    else:
+        options.update(
+            workers=worker_count(),
+            limit_concurrency=int(os.getenv("LIMIT_CONCURRENCY", "1000")),
+            backlog=int(os.getenv("BACKLOG", "2048")),
+        )
     
     try:
-        # Start uvicorn server
-        subprocess.run([
-            sys.executable, "-m", "uvicorn",
-            "backend:app",
-            "--host", "0.0.0.0",
-            "--port", "8000",
-            "--reload"
-        ])
-    except KeyboardInterrupt:
+        # Serve in this process; uvicorn handles Ctrl+C and shuts down cleanly
+        uvicorn.run("backend:app", **options)
         print("\n\n Server stopped. Goodbye!")
     except Exception as e:
         print(f"\n Error starting server: {e}")
@@ -139,9 +175,11 @@ def main():
     # Check/initialize vector database
     check_vector_db()
     
-    print("\n" + "="*70)
-    print("   All checks passed!")
-    print("="*70)
+    write_block(
+        "\n" + "="*70,
+        "   All checks passed!",
+        "="*70,
+    )
     
     # Start server
     start_server()
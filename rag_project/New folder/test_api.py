@@ -3,13 +3,127 @@ Test script for the Nigerian Law RAG API with Authentication
 Demonstrates the complete authentication and query flow
 """
 
+import asyncio
+import httpx
 import requests
-import json
-from typing import Dict, Optional
+import orjson
+import secrets
+import sys
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from typing import Dict, List, Optional
 
 # Configuration
 BASE_URL = "http://localhost:8000"
 
+
+def write_block(*lines):
+    """Write several lines to stdout in one call"""
+    sys.stdout.write("\n".join(lines) + "\n")
+    sys.stdout.flush()
+
+
+def _health_ok(base_url: str = BASE_URL) -> bool:
+    """True if the server answers /health"""
+    try:
+        requests.get(f"{base_url}/health", timeout=2).raise_for_status()
+    except requests.exceptions.RequestException:
+        return False
+    return True
+
+
+# Response handling shared by LawRagClient and AsyncLawRagClient; requests
+# and httpx responses both expose status_code and content
+
+def _sign_in(client, data: Dict):
+    """Store the token and session of a successful register/login"""
+    client._set_token(data["token"])
+    client.session_id = data["session_id"]
+    client.email = data["email"]
+
+
+def _registered(client, response) -> Dict:
+    data = orjson.loads(response.content)
+    if response.status_code != 200:
+        print(f"❌ Registration failed: {data}")
+        return data
+    _sign_in(client, data)
+    print(f"✅ Registration successful!")
+    print(f"📧 Email: {data['email']}")
+    print(f"🆔 Session ID: {data['session_id']}")
+    print(f"🔑 Token: {data['token'][:20]}...")
+    return data
+
+
+def _logged_in(client, response) -> Dict:
+    data = orjson.loads(response.content)
+    if response.status_code != 200:
+        print(f"❌ Login failed: {data}")
+        return data
+    _sign_in(client, data)
+    print(f"✅ Login successful!")
+    print(f"🔑 New token: {data['token'][:20]}...")
+    return data
+
+
+def _show_user_info(response) -> Dict:
+    data = orjson.loads(response.content)
+    if response.status_code != 200:
+        print(f"❌ Failed to get user info: {data}")
+        return data
+    print(f"👤 User Info:")
+    print(f"   Email: {data['email']}")
+    print(f"   Name: {data.get('name', 'N/A')}")
+    print(f"   Session ID: {data['session_id']}")
+    print(f"   Messages: {data['message_count']}")
+    return data
+
+
+def _show_batch(response) -> Dict:
+    data = orjson.loads(response.content)
+    if response.status_code != 200:
+        print(f"❌ Batch query failed: {data}")
+        return data
+    for result in data["results"]:
+        print(f"\n💬 Query: {result['query']}")
+        print(f"\n📝 Response: {result['response'][:200]}...")
+        print(f"\n📚 Sources: {', '.join(result['sources'][:3])}")
+    return data
+
+
+def _show_history(response) -> Dict:
+    data = orjson.loads(response.content)
+    if response.status_code != 200:
+        print(f"❌ Failed to get history: {data}")
+        return data
+    print(f"\n📜 Conversation History ({data['total_messages']} messages):")
+    for i, msg in enumerate(data['messages'][-5:], 1):  # Show last 5
+        role_emoji = "👤" if msg['role'] == 'user' else "🤖"
+        print(f"   {role_emoji} {msg['role']}: {msg['content'][:80]}...")
+    return data
+
+
+def _history_cleared(response) -> Dict:
+    data = orjson.loads(response.content)
+    if response.status_code != 200:
+        print(f"❌ Failed to clear history: {data}")
+        return data
+    print("✅ Conversation history cleared")
+    return data
+
+
+def _show_stats(response) -> Dict:
+    data = orjson.loads(response.content)
+    if response.status_code != 200:
+        print(f"❌ Failed to get stats: {data}")
+        return data
+    print(f"\n📊 Statistics:")
+    print(f"   Messages: {data['message_count']}")
+    print(f"   User since: {data['user_since']}")
+    print(f"   Documents: {', '.join(data['documents'])}")
+    return data
+
+
 class LawRagClient:
     """Client for Nigerian Law RAG API"""
     
@@ -18,46 +132,37 @@ class LawRagClient:
         self.token: Optional[str] = None
         self.session_id: Optional[str] = None
         self.email: Optional[str] = None
+        # One pooled session for every call, so requests reuse keep-alive
+        # connections instead of opening a new one each time
+        self._s = requests.Session()
+        # Bodies are encoded with orjson and sent as raw bytes
+        self._s.headers["Content-Type"] = "application/json"
+        self._s.mount("http://", HTTPAdapter(
+            pool_connections=10,
+            pool_maxsize=50,
+            max_retries=Retry(total=3, backoff_factor=0.2),
+        ))
+    
+    def _set_token(self, token: str):
+        """Remember the token and send it with every following request"""
+        self.token = token
+        self._s.headers["Authorization"] = f"Bearer {token}"
     
     def register(self, email: str, name: Optional[str] = None) -> Dict:
         """Register a new user"""
-        response = requests.post(
+        response = self._s.post(
             f"{self.base_url}/auth/register",
-            json={"email": email, "name": name}
+            data=orjson.dumps({"email": email, "name": name})
         )
-        
-        if response.status_code == 200:
-            data = response.json()
-            self.token = data["token"]
-            self.session_id = data["session_id"]
-            self.email = data["email"]
-            print(f"✅ Registration successful!")
-            print(f"📧 Email: {data['email']}")
-            print(f"🆔 Session ID: {data['session_id']}")
-            print(f"🔑 Token: {data['token'][:20]}...")
-            return data
-        else:
-            print(f"❌ Registration failed: {response.json()}")
-            return response.json()
+        return _registered(self, response)
     
     def login(self, email: str, session_id: str) -> Dict:
         """Login with email and session_id"""
-        response = requests.post(
+        response = self._s.post(
             f"{self.base_url}/auth/login",
-            json={"email": email, "session_id": session_id}
+            data=orjson.dumps({"email": email, "session_id": session_id})
         )
-        
-        if response.status_code == 200:
-            data = response.json()
-            self.token = data["token"]
-            self.session_id = data["session_id"]
-            self.email = data["email"]
-            print(f"✅ Login successful!")
-            print(f"🔑 New token: {data['token'][:20]}...")
-            return data
-        else:
-            print(f"❌ Login failed: {response.json()}")
-            return response.json()
+        return _logged_in(self, response)
     
     def get_user_info(self) -> Dict:
         """Get current user information"""
@@ -65,20 +170,7 @@ class LawRagClient:
             print("❌ Not authenticated. Please login first.")
             return {}
         
-        headers = {"Authorization": f"Bearer {self.token}"}
-        response = requests.get(f"{self.base_url}/auth/me", headers=headers)
-        
-        if response.status_code == 200:
-            data = response.json()
-            print(f"👤 User Info:")
-            print(f"   Email: {data['email']}")
-            print(f"   Name: {data.get('name', 'N/A')}")
-            print(f"   Session ID: {data['session_id']}")
-            print(f"   Messages: {data['message_count']}")
-            return data
-        else:
-            print(f"❌ Failed to get user info: {response.json()}")
-            return response.json()
+        return _show_user_info(self._s.get(f"{self.base_url}/auth/me"))
     
     def query(self, query_text: str) -> Dict:
         """Query the Nigerian law documents"""
@@ -86,22 +178,55 @@ class LawRagClient:
             print("❌ Not authenticated. Please login first.")
             return {}
         
-        headers = {"Authorization": f"Bearer {self.token}"}
-        response = requests.post(
-            f"{self.base_url}/query",
-            json={"query": query_text},
-            headers=headers
-        )
+        # Server-Sent Events: the answer is printed as it is generated.
+        # The with block closes the response (and frees its pooled
+        # connection) on every return path.
+        with self._s.post(
+            f"{self.base_url}/query/stream",
+            data=orjson.dumps({"query": query_text}),
+            stream=True
+        ) as response:
+            if response.status_code == 200:
+                print(f"\n💬 Query: {query_text}")
+                print(f"\n📝 Response: ", end="", flush=True)
+                data = {}
+                for line in response.iter_lines():
+                    if not line.startswith(b"data: "):
+                        continue
+                    payload = orjson.loads(line[6:])
+                    if "delta" in payload:
+                        print(payload["delta"], end="", flush=True)
+                    elif "error" in payload:
+                        print(f"\n❌ Query failed: {payload['error']}")
+                        return payload
+                    elif payload.get("done"):
+                        data = {
+                            "query": query_text,
+                            "response": payload["response"],
+                            "sources": payload["sources"],
+                            "timestamp": payload["timestamp"]
+                        }
+                if not data:
+                    print("\n❌ Query failed: stream ended before the answer was complete")
+                    return data
+                print(f"\n\n📚 Sources: {', '.join(data['sources'][:3])}")
+                return data
+            else:
+                data = orjson.loads(response.content)
+                print(f"❌ Query failed: {data}")
+                return data
+    
+    def query_batch(self, queries: List[str]) -> Dict:
+        """Send several queries in one request"""
+        if not self.token:
+            print("❌ Not authenticated. Please login first.")
+            return {}
         
-        if response.status_code == 200:
-            data = response.json()
-            print(f"\n💬 Query: {data['query']}")
-            print(f"\n📝 Response: {data['response'][:200]}...")
-            print(f"\n📚 Sources: {', '.join(data['sources'][:3])}")
-            return data
-        else:
-            print(f"❌ Query failed: {response.json()}")
-            return response.json()
+        response = self._s.post(
+            f"{self.base_url}/query/batch",
+            data=orjson.dumps({"queries": queries})
+        )
+        return _show_batch(response)
     
     def get_history(self) -> Dict:
         """Get conversation history"""
@@ -109,19 +234,7 @@ class LawRagClient:
             print("❌ Not authenticated. Please login first.")
             return {}
         
-        headers = {"Authorization": f"Bearer {self.token}"}
-        response = requests.get(f"{self.base_url}/history", headers=headers)
-        
-        if response.status_code == 200:
-            data = response.json()
-            print(f"\n📜 Conversation History ({data['total_messages']} messages):")
-            for i, msg in enumerate(data['messages'][-5:], 1):  # Show last 5
-                role_emoji = "👤" if msg['role'] == 'user' else "🤖"
-                print(f"   {role_emoji} {msg['role']}: {msg['content'][:80]}...")
-            return data
-        else:
-            print(f"❌ Failed to get history: {response.json()}")
-            return response.json()
+        return _show_history(self._s.get(f"{self.base_url}/history"))
     
     def clear_history(self) -> Dict:
         """Clear conversation history"""
@@ -129,15 +242,7 @@ class LawRagClient:
             print("❌ Not authenticated. Please login first.")
             return {}
         
-        headers = {"Authorization": f"Bearer {self.token}"}
-        response = requests.delete(f"{self.base_url}/history", headers=headers)
-        
-        if response.status_code == 200:
-            print("✅ Conversation history cleared")
-            return response.json()
-        else:
-            print(f"❌ Failed to clear history: {response.json()}")
-            return response.json()
+        return _history_cleared(self._s.delete(f"{self.base_url}/history"))
     
     def get_stats(self) -> Dict:
         """Get user statistics"""
@@ -145,78 +250,133 @@ class LawRagClient:
             print("❌ Not authenticated. Please login first.")
             return {}
         
-        headers = {"Authorization": f"Bearer {self.token}"}
-        response = requests.get(f"{self.base_url}/stats", headers=headers)
-        
-        if response.status_code == 200:
-            data = response.json()
-            print(f"\n📊 Statistics:")
-            print(f"   Messages: {data['message_count']}")
-            print(f"   User since: {data['user_since']}")
-            print(f"   Documents: {', '.join(data['documents'])}")
-            return data
-        else:
-            print(f"❌ Failed to get stats: {response.json()}")
-            return response.json()
-
+        return _show_stats(self._s.get(f"{self.base_url}/stats"))
 
-def test_complete_flow():
-    """Test the complete authentication and query flow"""
-    print("=" * 60)
-    print("🧪 Testing Nigerian Law RAG API - Authentication Flow")
-    print("=" * 60)
+class AsyncLawRagClient:
+    """Async client for Nigerian Law RAG API, for running independent calls concurrently"""
     
-    client = LawRagClient()
+    def __init__(self, base_url: str = BASE_URL):
+        self.token: Optional[str] = None
+        self.session_id: Optional[str] = None
+        self.email: Optional[str] = None
+        # RAG answers can take a while, so no read timeout (as with requests).
+        # HTTP/2 is negotiated over TLS only, so it applies when the API sits
+        # behind an HTTPS front (nginx, Hypercorn); concurrent calls then
+        # share one multiplexed connection. uvicorn itself speaks HTTP/1.1.
+        self._c = httpx.AsyncClient(
+            base_url=base_url,
+            http2=base_url.startswith("https://"),
+            headers={"Content-Type": "application/json"},
+            timeout=None,
+            limits=httpx.Limits(max_connections=20, max_keepalive_connections=20),
+        )
     
-    # Test 1: Health check
-    print("\n1️⃣ Testing health check...")
-    response = requests.get(f"{BASE_URL}/health")
-    print(f"✅ Health check: {response.json()['status']}")
+    async def aclose(self):
+        await self._c.aclose()
     
-    # Test 2: Register new user
-    print("\n2️⃣ Registering new user...")
-    email = f"test_user_{requests.utils.uuid4().hex[:8]}@example.com"
-    client.register(email=email, name="Test User")
+    def _set_token(self, token: str):
+        """Remember the token and send it with every following request"""
+        self.token = token
+        self._c.headers["Authorization"] = f"Bearer {token}"
     
-    # Save credentials for later
-    saved_session_id = client.session_id
+    def logout(self):
+        """Forget the token, so following requests are unauthenticated"""
+        self.token = None
+        self._c.headers.pop("Authorization", None)
     
-    # Test 3: Get user info
-    print("\n3️⃣ Getting user info...")
-    client.get_user_info()
+    async def health(self) -> Dict:
+        """Check the API's health"""
+        response = await self._c.get("/health")
+        return orjson.loads(response.content)
     
-    # Test 4: Query documents
-    print("\n4️⃣ Querying Nigerian law documents...")
-    client.query("What are the key provisions of Nigerian banking law?")
+    async def register(self, email: str, name: Optional[str] = None) -> Dict:
+        """Register a new user"""
+        response = await self._c.post("/auth/register", content=orjson.dumps({"email": email, "name": name}))
+        return _registered(self, response)
     
-    # Test 5: Another query
-    print("\n5️⃣ Another query...")
-    client.query("Explain the regulatory framework for insurance companies in Nigeria")
+    async def login(self, email: str, session_id: str) -> Dict:
+        """Login with email and session_id"""
+        response = await self._c.post("/auth/login", content=orjson.dumps({"email": email, "session_id": session_id}))
+        return _logged_in(self, response)
     
-    # Test 6: Get conversation history
-    print("\n6️⃣ Getting conversation history...")
-    client.get_history()
+    async def get_user_info(self) -> Dict:
+        """Get current user information"""
+        return _show_user_info(await self._c.get("/auth/me"))
     
-    # Test 7: Get statistics
-    print("\n7️⃣ Getting statistics...")
-    client.get_stats()
+    async def query_batch(self, queries: List[str]) -> Dict:
+        """Send several queries in one request"""
+        return _show_batch(await self._c.post("/query/batch", content=orjson.dumps({"queries": queries})))
     
-    # Test 8: Logout and login again
-    print("\n8️⃣ Testing login with saved credentials...")
-    client.token = None  # Simulate logout
-    client.login(email=email, session_id=saved_session_id)
+    async def get_history(self) -> Dict:
+        """Get conversation history"""
+        return _show_history(await self._c.get("/history"))
     
-    # Test 9: Verify session persisted
-    print("\n9️⃣ Verifying session persisted after login...")
-    client.get_history()
+    async def clear_history(self) -> Dict:
+        """Clear conversation history"""
+        return _history_cleared(await self._c.delete("/history"))
     
-    # Test 10: Clear history
-    print("\n🔟 Clearing conversation history...")
-    client.clear_history()
+    async def get_stats(self) -> Dict:
+        """Get user statistics"""
+        return _show_stats(await self._c.get("/stats"))
+
+async def test_complete_flow():
+    """Test the complete authentication and query flow"""
+    write_block(
+        "=" * 60,
+        "🧪 Testing Nigerian Law RAG API - Authentication Flow",
+        "=" * 60,
+    )
     
-    print("\n" + "=" * 60)
-    print("✅ All tests completed successfully!")
-    print("=" * 60)
+    client = AsyncLawRagClient()
+    
+    try:
+        # Test 1: Health check
+        print("\n1️⃣ Testing health check...")
+        print(f"✅ Health check: {(await client.health())['status']}")
+        
+        # Test 2: Register new user
+        print("\n2️⃣ Registering new user...")
+        email = f"test_user_{secrets.token_hex(4)}@example.com"
+        await client.register(email=email, name="Test User")
+        
+        # Save credentials for later
+        saved_session_id = client.session_id
+        
+        # Test 3: Get user info
+        print("\n3️⃣ Getting user info...")
+        await client.get_user_info()
+        
+        # Tests 4 and 5: independent queries, sent in one batch request
+        print("\n4️⃣ 5️⃣ Querying Nigerian law documents (one batch of two)...")
+        await client.query_batch([
+            "What are the key provisions of Nigerian banking law?",
+            "Explain the regulatory framework for insurance companies in Nigeria",
+        ])
+        
+        # Tests 6 and 7: history and statistics, read together
+        print("\n6️⃣ 7️⃣ Getting conversation history and statistics...")
+        await asyncio.gather(client.get_history(), client.get_stats())
+        
+        # Test 8: Logout and login again
+        print("\n8️⃣ Testing login with saved credentials...")
+        client.logout()  # Simulate logout
+        await client.login(email=email, session_id=saved_session_id)
+        
+        # Test 9: Verify session persisted
+        print("\n9️⃣ Verifying session persisted after login...")
+        await client.get_history()
+        
+        # Test 10: Clear history
+        print("\n🔟 Clearing conversation history...")
+        await client.clear_history()
+    finally:
+        await client.aclose()
+    
+    write_block(
+        "\n" + "=" * 60,
+        "✅ All tests completed successfully!",
+        "=" * 60,
+    )
     
     return client
 
@@ -314,15 +474,12 @@ def interactive_demo():
 
 
 if __name__ == "__main__":
-    import sys
-    
     print("\n🚀 Nigerian Law RAG API - Test Suite\n")
     
     # Check if server is running
-    try:
-        response = requests.get(f"{BASE_URL}/health", timeout=2)
+    if _health_ok():
         print(f"✅ Server is running at {BASE_URL}\n")
-    except requests.exceptions.ConnectionError:
+    else:
         print(f"❌ Error: Server is not running at {BASE_URL}")
         print("Please start the server first: python backend.py")
         sys.exit(1)
@@ -336,8 +493,13 @@ if __name__ == "__main__":
         else:
             print("Usage: python test_api.py [demo|errors]")
     else:
-        # Run complete test flow
-        test_complete_flow()
+        # Run complete test flow, on uvloop where it is installed
+        try:
+            import uvloop
+            uvloop.install()
+        except ImportError:
+            pass
+        asyncio.run(test_complete_flow())
         
         print("\n💡 Tips:")
         print("   - Run 'python test_api.py demo' for interactive demo")
@@ -2,28 +2,29 @@
 Simple Test Client for Nigerian Law RAG API
 """
 
-import requests
+import asyncio
+import httpx
 import json
 
 BASE_URL = "http://localhost:8000"
 
-def test_health():
+async def test_health(client):
     """Test health endpoint"""
     print("\n" + "="*60)
     print("TEST 1: Health Check")
     print("="*60)
     
-    response = requests.get(f"{BASE_URL}/health")
+    response = await client.get("/health")
     print(f"Status: {response.status_code}")
     print(json.dumps(response.json(), indent=2))
 
-def test_create_session():
+async def test_create_session(client):
     """Test session creation"""
     print("\n" + "="*60)
     print("TEST 2: Create Session")
     print("="*60)
     
-    response = requests.post(f"{BASE_URL}/sessions")
+    response = await client.post("/sessions")
     data = response.json()
     session_id = data["session_id"]
     
@@ -32,7 +33,7 @@ def test_create_session():
     
     return session_id
 
-def test_query(session_id):
+async def test_query(client, session_id):
     """Test document query"""
     print("\n" + "="*60)
     print("TEST 3: Query Documents")
@@ -46,14 +47,14 @@ def test_query(session_id):
         "session_id": session_id
     }
     
-    response = requests.post(f"{BASE_URL}/query", json=payload)
+    response = await client.post("/query", json=payload)
     data = response.json()
     
     print(f"Status: {response.status_code}")
     print(f"\nResponse:\n{data['response'][:500]}...")
     print(f"\nSources: {data['sources']}")
 
-def test_follow_up(session_id):
+async def test_follow_up(client, session_id):
     """Test follow-up query"""
     print("\n" + "="*60)
     print("TEST 4: Follow-up Query")
@@ -67,21 +68,23 @@ def test_follow_up(session_id):
         "session_id": session_id
     }
     
-    response = requests.post(f"{BASE_URL}/query", json=payload)
+    response = await client.post("/query", json=payload)
     data = response.json()
     
     print(f"Status: {response.status_code}")
     print(f"\nResponse:\n{data['response'][:500]}...")
 
-def test_history(session_id):
+async def test_history(client, session_id):
     """Test conversation history"""
+    # Fetched before printing, so output stays in one block when run
+    # alongside other tests
+    response = await client.get(f"/sessions/{session_id}/history")
+    data = response.json()
+    
     print("\n" + "="*60)
     print("TEST 5: Conversation History")
     print("="*60)
     
-    response = requests.get(f"{BASE_URL}/sessions/{session_id}/history")
-    data = response.json()
-    
     print(f"Status: {response.status_code}")
     print(f"Total Messages: {data['total_messages']}")
     print("\nMessages:")
@@ -90,48 +93,47 @@ def test_history(session_id):
         print(f"\n{i}. {msg['role'].upper()}:")
         print(f"   {msg['content'][:100]}...")
 
-def test_stats():
+async def test_stats(client):
     """Test system statistics"""
+    response = await client.get("/stats")
+    data = response.json()
+    
     print("\n" + "="*60)
     print("TEST 6: System Statistics")
     print("="*60)
     
-    response = requests.get(f"{BASE_URL}/stats")
-    data = response.json()
-    
     print(f"Status: {response.status_code}")
     print(json.dumps(data, indent=2))
 
-def run_all_tests():
+async def run_all_tests():
     """Run all tests"""
     print("\n" + "="*60)
     print("  Nigerian Law RAG API - Test Suite")
     print("="*60)
     
     try:
-        # Test 1: Health
-        test_health()
-        
-        # Test 2: Create session
-        session_id = test_create_session()
-        
-        # Test 3: First query
-        test_query(session_id)
-        
-        # Test 4: Follow-up
-        test_follow_up(session_id)
-        
-        # Test 5: History
-        test_history(session_id)
-        
-        # Test 6: Stats
-        test_stats()
+        # RAG answers can take a while, so no read timeout
+        async with httpx.AsyncClient(base_url=BASE_URL, timeout=None) as client:
+            # Test 1: Health
+            await test_health(client)
+            
+            # Test 2: Create session
+            session_id = await test_create_session(client)
+            
+            # Test 3: First query
+            await test_query(client, session_id)
+            
+            # Test 4: Follow-up (needs the first answer in the session)
+            await test_follow_up(client, session_id)
+            
+            # Tests 5 and 6: history and stats don't depend on each other
+            await asyncio.gather(test_history(client, session_id), test_stats(client))
         
         print("\n" + "="*60)
         print("   All Tests Completed Successfully!")
         print("="*60 + "\n")
     
-    except requests.exceptions.ConnectionError:
+    except httpx.ConnectError:
         print("\n Error: Cannot connect to the API")
         print("Make sure the server is running:")
         print("  python backend.py")
@@ -141,4 +143,10 @@ def run_all_tests():
         print(f"\n Error: {e}")
 
 if __name__ == "__main__":
-    run_all_tests()
\ No newline at end of file
+    # Run on uvloop where it is installed
+    try:
+        import uvloop
+        uvloop.install()
+    except ImportError:
+        pass
+    asyncio.run(run_all_tests())
\ No newline at end of file
@@ -0,0 +1,50 @@
+"""
+Tests for the agent's conversation memory (LRUMemorySaver)
+Run with: python -m pytest test_memory.py
+"""
+
+import asyncio
+import os
+
+# app exits at import without a key; these tests never call OpenAI
+os.environ.setdefault("OPENAI_API_KEY", "test-key")
+
+from langchain_core.messages import HumanMessage
+from langgraph.graph import START, END, StateGraph
+
+from app import AgentState, LRUMemorySaver
+
+
+def build_graph(checkpointer):
+    """One no-op node, enough to make the graph save a checkpoint per thread"""
+    graph = StateGraph(AgentState)
+    graph.add_node("agent", lambda state: {})
+    graph.add_edge(START, "agent")
+    graph.add_edge("agent", END)
+    return graph.compile(checkpointer=checkpointer)
+
+
+def test_async_stream_evicts_least_recent_thread():
+    """Threads driven through astream (as query_agent_stream does) are evicted"""
+    saver = LRUMemorySaver(maxsize=2)
+    graph = build_graph(saver)
+
+    async def run():
+        for thread_id in ("a", "b", "c"):
+            config = {"configurable": {"thread_id": thread_id}}
+            async for _ in graph.astream({"messages": [HumanMessage("hi")]}, config):
+                pass
+
+    asyncio.run(run())
+
+    assert sorted(saver.storage) == ["b", "c"]
+
+
+def test_sync_invoke_evicts_least_recent_thread():
+    saver = LRUMemorySaver(maxsize=2)
+    graph = build_graph(saver)
+
+    for thread_id in ("a", "b", "c"):
+        graph.invoke({"messages": [HumanMessage("hi")]}, {"configurable": {"thread_id": thread_id}})
+
+    assert sorted(saver.storage) == ["b", "c"]